@@ -2,9 +2,11 @@ import logging
 from datetime import datetime
 import geoip2.database
 import os
-from collections import Counter
 import math
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from sketch import StreamAggregator
+from commands import CommandMatcher, CommandFeatureCache
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +14,8 @@ class FeatureExtractor:
     """
     Extracts features from log entries for anomaly detection and classification.
     """
-    def __init__(self):
+    def __init__(self, aggregator: Optional[StreamAggregator] = None,
+                 command_matcher: Optional[CommandMatcher] = None, command_cache_size: int = 4096):
         geoip_path = os.getenv("GEOIP_PATH")
         if not geoip_path:
             logger.critical("GEOIP_PATH environment variable is not set.")
@@ -24,10 +27,11 @@ class FeatureExtractor:
         except Exception as e:
             logger.critical(f"Failed to load GeoIP database: {e}")
             raise
-        self.suspicious_commands = {
-            'wget', 'curl', 'chmod', 'chown', 'passwd',
-            'rm', 'mv', 'tar', 'nc', 'telnet', 'su', 'sudo', 'ssh', 'ftp', 'uname', 'id'
-        }
+        # Full command-line rules, with command features memoized per command tuple
+        self.command_matcher = command_matcher or CommandMatcher()
+        self.command_cache = CommandFeatureCache(self.command_matcher, max_entries=command_cache_size)
+        # Optional sliding-window sketches for per-IP rates and distinct counts
+        self.aggregator = aggregator
 
     def transform(self, log_entry: Dict[str, Any]) -> Dict[str, float]:
         """
@@ -56,20 +60,11 @@ class FeatureExtractor:
             duration = log_entry.get('duration', 0)
             commands = log_entry.get('commands', [])
             features['session_duration'] = duration
-            features['unique_commands'] = len(set(commands))
-            features['total_commands'] = len(commands)
-            features['suspicious_command_count'] = self._count_suspicious_commands(log_entry)
-            if features['total_commands'] > 0:
-                features['proportion_suspicious_commands'] = features['suspicious_command_count'] / features['total_commands']
-            else:
-                features['proportion_suspicious_commands'] = 0
-            if commands:
-                freq = Counter(commands)
-                total = len(commands)
-                entropy = -sum((count / total) * math.log2(count / total) for count in freq.values() if count > 0)
-                features['command_entropy'] = entropy
-            else:
-                features['command_entropy'] = 0
+            features.update(self.command_cache.features(commands or []))
+
+            if self.aggregator is not None:
+                self.observe(log_entry, timestamp)
+                features.update(self.aggregator.features(log_entry.get('source_ip', 'unknown')))
 
             features['ip_reputation'] = self._get_ip_reputation(log_entry.get('source_ip', ''))
             features['country_risk'] = self._get_country_risk(log_entry.get('source_ip', ''))
@@ -82,9 +77,24 @@ class FeatureExtractor:
             logger.error(f"Error extracting features: {e}")
         return features
 
-    def _count_suspicious_commands(self, log_entry: Dict[str, Any]) -> int:
-        commands = log_entry.get('commands', [])
-        return sum(1 for cmd in commands if isinstance(cmd, str) and cmd.split()[0] in self.suspicious_commands)
+    def observe(self, log_entry: Dict[str, Any], timestamp: Optional[datetime] = None) -> None:
+        """
+        Update the sliding-window aggregates for a log entry without extracting features.
+        """
+        if self.aggregator is None:
+            return
+        try:
+            if timestamp is None:
+                timestamp = datetime.fromisoformat(log_entry['timestamp'])
+            auth_attempts = log_entry.get('auth_attempts', {'failed': 0, 'success': 0})
+            self.aggregator.observe(
+                log_entry.get('source_ip', 'unknown'),
+                timestamp.timestamp(),
+                username=log_entry.get('username'),
+                attempts=auth_attempts.get('failed', 0) + auth_attempts.get('success', 0)
+            )
+        except Exception as e:
+            logger.error(f"Error updating stream aggregates: {e}")
 
     def _get_ip_reputation(self, ip: str) -> float:
         # Placeholder for future integration with threat intelligence feeds
@@ -15,15 +15,19 @@ class PerformanceMonitor:
     def __init__(self):
         self.log_entries = []
 
-    def update(self, score: float, is_attack: bool, true_label: Optional[bool] = None) -> None:
+    def update(self, score: float, is_attack: bool, true_label: Optional[bool] = None, weight: int = 1) -> None:
+        """
+        Record a scored event. weight > 1 records that many equivalent events at once.
+        """
         entry = {
             'timestamp': datetime.now(),
             'score': score,
             'is_attack': is_attack,
-            'true_label': true_label
+            'true_label': true_label,
+            'weight': weight
         }
         self.log_entries.append(entry)
-        logger.debug(f"PerformanceMonitor updated: {entry}")
+        logger.debug("PerformanceMonitor updated: %s", entry)
 
     def generate_report(self) -> None:
         labeled_entries = [entry for entry in self.log_entries if entry['true_label'] is not None]
@@ -35,7 +39,8 @@ class PerformanceMonitor:
         # Plot 1: Score distribution
         ax1 = fig.add_subplot(2, 2, 1)
         scores = [entry['score'] for entry in self.log_entries]
-        ax1.hist(scores, bins=50, alpha=0.7)
+        weights = [entry.get('weight', 1) for entry in self.log_entries]
+        ax1.hist(scores, bins=50, weights=weights, alpha=0.7)
         ax1.set_title('Anomaly Score Distribution')
         ax1.set_xlabel('Score')
         ax1.set_ylabel('Count')
@@ -49,7 +54,7 @@ class PerformanceMonitor:
         # Plot 2: Cumulative attack counts
         ax2 = fig.add_subplot(2, 2, 2)
         timestamps_all = [entry['timestamp'] for entry in self.log_entries]
-        detected_attacks_all = [1 if entry['is_attack'] else 0 for entry in self.log_entries]
+        detected_attacks_all = [entry.get('weight', 1) if entry['is_attack'] else 0 for entry in self.log_entries]
         cumulative_detected = np.cumsum(detected_attacks_all)
         ax2.plot(timestamps_all, cumulative_detected, label='Detected Attacks')
         ax2.set_title('Cumulative Attack Counts')
@@ -0,0 +1,107 @@
+import logging
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """
+    Overload protection in front of scoring. Tracks ingest queue depth and
+    processing lag; while overloaded, repetitive low-risk auth events from known
+    IPs are sampled at an adaptive keep ratio (multiplicative decrease, additive
+    increase). Sessions with commands, successful logins and first sightings of
+    an IP are always admitted. Shedding switches off once the keep ratio has
+    recovered to 1.
+    """
+    def __init__(self, high_watermark: int = 1000, low_watermark: int = 100, max_lag_seconds: float = 30.0,
+                 min_keep_ratio: float = 0.05, decrease: float = 0.5, increase: float = 0.1,
+                 adjust_interval: float = 1.0):
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.max_lag_seconds = max_lag_seconds
+        self.min_keep_ratio = min_keep_ratio
+        self.decrease = decrease
+        self.increase = increase
+        self.adjust_interval = adjust_interval
+        self.keep_ratio = 1.0
+        self.shedding = False
+        self.depth = 0
+        self.lag = 0.0
+        self.last_lag = 0.0
+        self.credit = 0.0
+        self.last_adjust = time.monotonic()
+        self.seen = 0
+        self.admitted = 0
+        self.shed = 0
+        self.interval_seen = 0
+        self.interval_shed = 0
+        self.shed_rate = 0.0
+        logger.info("AdmissionController initialized: depth %d/%d, max lag %.0fs, min keep ratio %.2f",
+                    low_watermark, high_watermark, max_lag_seconds, min_keep_ratio)
+
+    def observe_load(self, depth: int, lag_seconds: float) -> None:
+        """
+        Record the current queue depth and lag; the keep ratio is adjusted at most
+        once per adjust_interval.
+        """
+        self.depth = depth
+        self.last_lag = lag_seconds
+        self.lag = max(self.lag, lag_seconds)
+        now = time.monotonic()
+        if now - self.last_adjust < self.adjust_interval:
+            return
+        overloaded = self.depth >= self.high_watermark or self.lag >= self.max_lag_seconds
+        caught_up = self.depth <= self.low_watermark and self.lag < self.max_lag_seconds / 2
+        if overloaded:
+            self.keep_ratio = max(self.min_keep_ratio, self.keep_ratio * self.decrease)
+            if not self.shedding:
+                logger.warning("Overloaded (queue depth %d, lag %.1fs); shedding low-risk events", self.depth, self.lag)
+            self.shedding = True
+        elif caught_up and self.shedding:
+            self.keep_ratio = min(1.0, self.keep_ratio + self.increase)
+            if self.keep_ratio >= 1.0:
+                self.shedding = False
+                logger.warning("Caught up (queue depth %d, lag %.1fs); load shedding off", self.depth, self.lag)
+        self.shed_rate = self.interval_shed / self.interval_seen if self.interval_seen else 0.0
+        self.interval_seen = self.interval_shed = 0
+        self.lag = 0.0
+        self.last_adjust = now
+
+    @staticmethod
+    def is_low_risk(log_entry: Dict[str, Any]) -> bool:
+        if log_entry.get('commands'):
+            return False
+        auth = log_entry.get('auth_attempts') or {}
+        return not auth.get('success', 0)
+
+    def admit(self, log_entry: Dict[str, Any], is_new_ip: bool) -> bool:
+        """
+        Whether the event should be fully scored. Shed events are still counted.
+        """
+        self.seen += 1
+        self.interval_seen += 1
+        if not self.shedding or is_new_ip or not self.is_low_risk(log_entry):
+            self.admitted += 1
+            return True
+        # Deterministic sampling: admit whenever the accumulated keep ratio reaches one
+        self.credit += self.keep_ratio
+        if self.credit >= 1.0:
+            self.credit -= 1.0
+            self.admitted += 1
+            return True
+        self.shed += 1
+        self.interval_shed += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'shedding': self.shedding,
+            'keep_ratio': self.keep_ratio,
+            'shed_rate': self.shed_rate,
+            'queue_depth': self.depth,
+            'lag_seconds': self.last_lag,
+            'seen': self.seen,
+            'admitted': self.admitted,
+            'shed': self.shed,
+        }
@@ -0,0 +1,263 @@
+import logging
+import atexit
+import json
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PARTITION_FORMAT = "%Y%m%dT%H"
+
+
+def _epoch(value) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def _partition(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime(PARTITION_FORMAT)
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class EventArchive:
+    """
+    Append-only columnar archive of scored events.
+
+    Events are buffered in memory and flushed as immutable segments of .npy
+    column files, partitioned by UTC hour:
+
+        <root>/<YYYYMMDDTHH>/seg-000001/{timestamp,ip,score,attack_type,actions,features}.npy
+        <root>/<YYYYMMDDTHH>/seg-000001/meta.json   feature names, row count, time range
+        <root>/<YYYYMMDDTHH>/index.json             IP -> segments containing it
+
+    Segments are readable with np.load(mmap_mode='r'); see ArchiveReader.
+
+    append() only buffers. Segments are written by a background thread, when
+    flush_rows events are buffered or after flush_seconds, even if the stream
+    has gone quiet. Buffered events are flushed at interpreter exit.
+    """
+    def __init__(self, root: str = "archive", flush_rows: int = 1000, flush_seconds: float = 60.0):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.buffers: Dict[str, List[tuple]] = {}
+        self.buffered = 0
+        self.rows_written = 0
+        self.lock = threading.Lock()
+        self.batches: queue.Queue = queue.Queue()
+        self.closed = False
+        os.makedirs(root, exist_ok=True)
+        self.writer = threading.Thread(target=self._write_loop, name="archive-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+        logger.info("EventArchive writing to %s (flush every %d rows or %.0fs)", root, flush_rows, flush_seconds)
+
+    def append(self, timestamp, ip: str, features: Dict[str, Any], score: float,
+               attack_type: str, actions: List[str]) -> None:
+        epoch = _epoch(timestamp)
+        numeric = {k: float(v) for k, v in features.items()
+                   if isinstance(v, (int, float)) and not isinstance(v, bool)}
+        row = (epoch, ip, float(score), attack_type or '', '|'.join(actions or []), numeric)
+        with self.lock:
+            self.buffers.setdefault(_partition(epoch), []).append(row)
+            self.buffered += 1
+            if self.buffered >= self.flush_rows:
+                self.batches.put(self._take_buffers())
+
+    def _take_buffers(self) -> Dict[str, List[tuple]]:
+        buffers = self.buffers
+        self.buffers = {}
+        self.buffered = 0
+        return buffers
+
+    def _write_loop(self) -> None:
+        while True:
+            try:
+                batch = self.batches.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                with self.lock:
+                    batch = self._take_buffers()
+                self._write_batch(batch)
+                continue
+            try:
+                if batch is None:
+                    return
+                self._write_batch(batch)
+            finally:
+                self.batches.task_done()
+
+    def _write_batch(self, batch: Dict[str, List[tuple]]) -> None:
+        for partition, rows in batch.items():
+            if rows:
+                try:
+                    self._write_segment(partition, rows)
+                    self.rows_written += len(rows)
+                except Exception as e:
+                    logger.error("Failed to write archive segment for %s: %s", partition, e)
+
+    def flush(self) -> None:
+        """
+        Hand all buffered events to the writer and wait until they are on disk.
+        """
+        with self.lock:
+            self.batches.put(self._take_buffers())
+        self.batches.join()
+
+    def _write_segment(self, partition: str, rows: List[tuple]) -> None:
+        partition_dir = os.path.join(self.root, partition)
+        os.makedirs(partition_dir, exist_ok=True)
+        existing = [d for d in os.listdir(partition_dir) if d.startswith('seg-') and not d.endswith('.tmp')]
+        name = f"seg-{len(existing) + 1:06d}"
+        tmp_dir = os.path.join(partition_dir, f"{name}.tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        rows.sort(key=lambda r: r[0])
+        feature_names = sorted({k for r in rows for k in r[5]})
+        features = np.full((len(rows), len(feature_names)), np.nan, dtype=np.float32)
+        positions = {k: i for i, k in enumerate(feature_names)}
+        for i, r in enumerate(rows):
+            for k, v in r[5].items():
+                features[i, positions[k]] = v
+        columns = {
+            'timestamp': np.array([r[0] for r in rows], dtype=np.float64),
+            'ip': np.array([r[1] for r in rows], dtype=np.str_),
+            'score': np.array([r[2] for r in rows], dtype=np.float32),
+            'attack_type': np.array([r[3] for r in rows], dtype=np.str_),
+            'actions': np.array([r[4] for r in rows], dtype=np.str_),
+            'features': features,
+        }
+        for column, values in columns.items():
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), values)
+        _write_json(os.path.join(tmp_dir, 'meta.json'), {
+            'rows': len(rows),
+            'feature_names': feature_names,
+            'min_timestamp': rows[0][0],
+            'max_timestamp': rows[-1][0],
+        })
+        os.replace(tmp_dir, os.path.join(partition_dir, name))
+
+        index_path = os.path.join(partition_dir, 'index.json')
+        index = _read_index(index_path)
+        for ip in {r[1] for r in rows}:
+            index.setdefault(ip, []).append(name)
+        _write_json(index_path, index)
+        logger.debug("Archived %d events to %s/%s", len(rows), partition, name)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        self.batches.put(None)
+        self.writer.join()
+        logger.info("EventArchive closed after writing %d events", self.rows_written)
+
+
+def _read_index(path: str) -> Dict[str, List[str]]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class ArchiveReader:
+    """
+    Query helper over an EventArchive directory. Only partitions overlapping the
+    time range are opened, and with an IP only the segments its index lists.
+    """
+    def __init__(self, root: str = "archive"):
+        self.root = root
+
+    def partitions(self, start: Optional[float] = None, end: Optional[float] = None) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        lo = _partition(start) if start is not None else None
+        hi = _partition(end) if end is not None else None
+        names = []
+        for name in sorted(os.listdir(self.root)):
+            try:
+                datetime.strptime(name, PARTITION_FORMAT)
+            except ValueError:
+                continue
+            if (lo is None or name >= lo) and (hi is None or name <= hi):
+                names.append(name)
+        return names
+
+    def query(self, ip: Optional[str] = None, start=None, end=None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Events for ip (or all IPs) with start <= timestamp < end, oldest first.
+        start and end may be datetimes or epoch seconds.
+        """
+        start = _epoch(start) if start is not None else None
+        end = _epoch(end) if end is not None else None
+        results = []
+        for partition in self.partitions(start, end):
+            partition_dir = os.path.join(self.root, partition)
+            if ip is not None:
+                segments = _read_index(os.path.join(partition_dir, 'index.json')).get(ip, [])
+            else:
+                segments = sorted(d for d in os.listdir(partition_dir) if d.startswith('seg-') and not d.endswith('.tmp'))
+            for segment in segments:
+                results.extend(self._read_segment(os.path.join(partition_dir, segment), ip, start, end))
+                if limit is not None and len(results) >= limit:
+                    return sorted(results, key=lambda e: e['timestamp'])[:limit]
+        return sorted(results, key=lambda e: e['timestamp'])
+
+    def _read_segment(self, path: str, ip: Optional[str], start: Optional[float], end: Optional[float]) -> List[Dict[str, Any]]:
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        if (start is not None and meta['max_timestamp'] < start) or (end is not None and meta['min_timestamp'] >= end):
+            return []
+        column = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        timestamps = column('timestamp')
+        mask = np.ones(len(timestamps), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps < end
+        if ip is not None:
+            mask &= column('ip') == ip
+        rows = np.nonzero(mask)[0]
+        if not len(rows):
+            return []
+        ips, scores = column('ip'), column('score')
+        attack_types, actions, features = column('attack_type'), column('actions'), column('features')
+        names = meta['feature_names']
+        events = []
+        for i in rows:
+            values = features[i]
+            events.append({
+                'timestamp': datetime.fromtimestamp(float(timestamps[i])),
+                'ip': str(ips[i]),
+                'score': float(scores[i]),
+                'attack_type': str(attack_types[i]),
+                'actions': str(actions[i]).split('|') if actions[i] else [],
+                'features': {n: float(v) for n, v in zip(names, values) if not np.isnan(v)},
+            })
+        return events
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Query the scored-event archive.")
+    parser.add_argument("ip", nargs="?", help="source IP to look up (all IPs if omitted)")
+    parser.add_argument("--root", default=os.getenv("ARCHIVE_DIR", "archive"))
+    parser.add_argument("--since", type=datetime.fromisoformat, help="ISO start time (inclusive)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="ISO end time (exclusive)")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    for event in ArchiveReader(args.root).query(args.ip, args.since, args.until, args.limit):
+        print(json.dumps(event, default=str))
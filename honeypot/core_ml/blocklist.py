@@ -0,0 +1,184 @@
+import logging
+import ipaddress
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Blocklist:
+    """
+    Index of blocked IPs and CIDR ranges with optional expiry, persisted to a JSON file.
+    Exact IPs are a single dict lookup; ranges are looked up once per distinct prefix length.
+    """
+    def __init__(self, path: Optional[str] = "blocklist.json", temp_block_seconds: float = 3600):
+        self.path = path
+        self.temp_block_seconds = temp_block_seconds
+        self.exact: Dict[str, Dict[str, Any]] = {}
+        # (ip version, prefix length) -> {network address as int: entry}
+        self.networks: Dict[tuple, Dict[int, Dict[str, Any]]] = {}
+        self.hits = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+        if path:
+            self.load()
+
+    def block(self, target: str, ttl: Optional[float] = None, attack_type: Optional[str] = None,
+              location: Optional[str] = None, expires: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Block an IP or CIDR range. ttl of None means a permanent block. An existing
+        permanent block is never shortened to a temporary one.
+        """
+        network = ipaddress.ip_network(target, strict=False)
+        if expires is None and ttl is not None:
+            expires = time.time() + ttl
+        entry = self._insert(network, {
+            'target': str(network) if network.num_addresses > 1 else str(network.network_address),
+            'expires': expires,
+            'attack_type': attack_type,
+            'location': location,
+            'added': time.time(),
+            'hits': 0,
+        })
+        logger.info("Blocked %s (%s)", entry['target'],
+                    "permanent" if entry['expires'] is None else f"until {time.ctime(entry['expires'])}")
+        return entry
+
+    def _insert(self, network, entry: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            existing = self._get_entry(network)
+            if existing is not None:
+                if existing['expires'] is None and entry['expires'] is not None:
+                    return existing
+                entry['hits'] = max(entry['hits'], existing.get('hits', 0))
+            if network.num_addresses == 1:
+                self.exact[entry['target']] = entry
+            else:
+                key = (network.version, network.prefixlen)
+                self.networks.setdefault(key, {})[int(network.network_address)] = entry
+            self.dirty = True
+        return entry
+
+    def block_temporarily(self, target: str, **kwargs) -> Dict[str, Any]:
+        return self.block(target, ttl=self.temp_block_seconds, **kwargs)
+
+    def _get_entry(self, network) -> Optional[Dict[str, Any]]:
+        if network.num_addresses == 1:
+            return self.exact.get(str(network.network_address))
+        return self.networks.get((network.version, network.prefixlen), {}).get(int(network.network_address))
+
+    def unblock(self, target: str) -> bool:
+        network = ipaddress.ip_network(target, strict=False)
+        with self.lock:
+            if network.num_addresses == 1:
+                removed = self.exact.pop(str(network.network_address), None)
+            else:
+                removed = self.networks.get((network.version, network.prefixlen), {}).pop(
+                    int(network.network_address), None)
+            if removed is not None:
+                self.dirty = True
+        return removed is not None
+
+    def lookup(self, ip: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the active block entry covering ip, or None. Expired entries are dropped.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.exact.get(ip)
+            if entry is None and self.networks:
+                try:
+                    addr = ipaddress.ip_address(ip)
+                except ValueError:
+                    return None
+                value, bits = int(addr), addr.max_prefixlen
+                for (version, prefixlen) in sorted(self.networks, key=lambda k: -k[1]):
+                    if version != addr.version:
+                        continue
+                    masked = value >> (bits - prefixlen) << (bits - prefixlen)
+                    entry = self.networks[(version, prefixlen)].get(masked)
+                    if entry is not None:
+                        break
+            if entry is None:
+                return None
+            if entry['expires'] is not None and entry['expires'] <= now:
+                self._remove(entry)
+                return None
+            entry['hits'] += 1
+            self.hits += 1
+            return entry
+
+    def _remove(self, entry: Dict[str, Any]) -> None:
+        network = ipaddress.ip_network(entry['target'], strict=False)
+        if network.num_addresses == 1:
+            self.exact.pop(entry['target'], None)
+        else:
+            self.networks.get((network.version, network.prefixlen), {}).pop(int(network.network_address), None)
+        self.dirty = True
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self.lock:
+            expired = [e for e in self.entries() if e['expires'] is not None and e['expires'] <= now]
+            for entry in expired:
+                self._remove(entry)
+        if expired:
+            logger.info("Purged %d expired blocklist entries", len(expired))
+        return len(expired)
+
+    def entries(self) -> Iterable[Dict[str, Any]]:
+        yield from list(self.exact.values())
+        for table in list(self.networks.values()):
+            yield from list(table.values())
+
+    def __len__(self) -> int:
+        return len(self.exact) + sum(len(t) for t in self.networks.values())
+
+    def load(self) -> None:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.info("No blocklist found at %s, starting empty.", self.path)
+            return
+        except Exception as e:
+            logger.error("Failed to load blocklist from %s: %s", self.path, e)
+            return
+        now = time.time()
+        for item in data.get('entries', []):
+            try:
+                if item.get('expires') is not None and item['expires'] <= now:
+                    continue
+                network = ipaddress.ip_network(item['target'], strict=False)
+                self._insert(network, {
+                    'target': str(network) if network.num_addresses > 1 else str(network.network_address),
+                    'expires': item.get('expires'),
+                    'attack_type': item.get('attack_type'),
+                    'location': item.get('location'),
+                    'added': item.get('added', now),
+                    'hits': item.get('hits', 0),
+                })
+            except Exception as e:
+                logger.warning("Skipping invalid blocklist entry %s: %s", item, e)
+        self.dirty = False
+        logger.info("Loaded %d blocklist entries from %s", len(self), self.path)
+
+    def save(self) -> None:
+        if not self.path or not self.dirty:
+            return
+        self.purge_expired()
+        with self.lock:
+            data = {'saved': time.time(), 'entries': list(self.entries())}
+            self.dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+            logger.info("Blocklist saved to %s (%d entries)", self.path, len(data['entries']))
+        except Exception as e:
+            self.dirty = True
+            logger.error("Failed to save blocklist: %s", e)
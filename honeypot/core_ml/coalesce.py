@@ -0,0 +1,167 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Burst:
+    """
+    A run of equivalent events from one IP, represented by its first event.
+    """
+    __slots__ = ('ip', 'signature', 'started', 'weight', 'score', 'attack_type', 'actions')
+
+    def __init__(self, ip: str, signature: Hashable, started: datetime):
+        self.ip = ip
+        self.signature = signature
+        self.started = started
+        self.weight = 1
+        self.score = 0.0
+        self.attack_type = None
+        self.actions = []
+
+
+class EventCoalescer:
+    """
+    Merges bursts of equivalent events per IP within a time window into one
+    weighted event. The first event of a burst is scored normally; later
+    equivalent events inside the window only increase the burst weight.
+    """
+    def __init__(self, window_seconds: float = 5.0, max_ips: int = 10000):
+        self.window_seconds = window_seconds
+        self.max_ips = max_ips
+        self.bursts: "OrderedDict[str, Burst]" = OrderedDict()
+        self.events_seen = 0
+        self.events_absorbed = 0
+        self.bursts_opened = 0
+        logger.info("EventCoalescer initialized with %ss window, tracking up to %d IPs", window_seconds, max_ips)
+
+    @staticmethod
+    def signature(log_entry: Dict[str, Any]) -> Hashable:
+        auth = log_entry.get('auth_attempts') or {}
+        commands = log_entry.get('commands') or []
+        return (
+            log_entry.get('log_type'),
+            log_entry.get('protocol'),
+            log_entry.get('destination_port'),
+            log_entry.get('username'),
+            tuple(c for c in commands if isinstance(c, str)),
+            auth.get('failed', 0) > 0,
+            auth.get('success', 0) > 0,
+        )
+
+    def absorb(self, ip: str, log_entry: Dict[str, Any], timestamp: datetime) -> Optional[Burst]:
+        """
+        Fold the event into the open burst for its IP if it is equivalent and
+        inside the window. Returns the burst when absorbed, otherwise None and
+        the caller should score the event and call open().
+        """
+        self.events_seen += 1
+        burst = self.bursts.get(ip)
+        if burst is None:
+            return None
+        if (burst.signature == self.signature(log_entry)
+                and 0 <= (timestamp - burst.started).total_seconds() <= self.window_seconds):
+            burst.weight += 1
+            self.events_absorbed += 1
+            self.bursts.move_to_end(ip)
+            return burst
+        return None
+
+    def open(self, ip: str, log_entry: Dict[str, Any], timestamp: datetime, score: float,
+             attack_type: str, actions: Iterable[str]) -> List[Burst]:
+        """
+        Start a new burst for the IP with the decision made for its first event.
+        Returns the bursts this closes, with their final weights: the IP's previous
+        burst, if any, and bursts evicted to stay within max_ips.
+        """
+        burst = Burst(ip, self.signature(log_entry), timestamp)
+        burst.score = score
+        burst.attack_type = attack_type
+        burst.actions = list(actions)
+        closed = []
+        previous = self.bursts.pop(ip, None)
+        if previous is not None:
+            closed.append(previous)
+        self.bursts[ip] = burst
+        self.bursts_opened += 1
+        while len(self.bursts) > self.max_ips:
+            closed.append(self.bursts.popitem(last=False)[1])
+        return closed
+
+    def close_all(self) -> List[Burst]:
+        """
+        Close and return every open burst, e.g. at shutdown.
+        """
+        closed = list(self.bursts.values())
+        self.bursts.clear()
+        return closed
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'events_seen': self.events_seen,
+            'events_absorbed': self.events_absorbed,
+            'bursts_opened': self.bursts_opened,
+            'absorbed_ratio': self.events_absorbed / self.events_seen if self.events_seen else 0.0,
+        }
+
+
+def _quantize(value: float, step: float) -> int:
+    # Linear buckets below 1, relative (log2) buckets above, so large counts
+    # like rates and durations share a key when they differ by a few percent
+    if abs(value) < 1:
+        return int(round(value / step))
+    bucket = int(round(math.log2(abs(value)) / step)) + int(round(1 / step))
+    return bucket if value > 0 else -bucket
+
+
+class ScoreCache:
+    """
+    Bounded LRU cache of detector results keyed on a quantized feature vector.
+    """
+    def __init__(self, max_entries: int = 5000, step: float = 0.1, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.step = step
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[Tuple, Tuple[float, Tuple[float, str, Dict[str, float]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        logger.info("ScoreCache initialized with %d entries, step %.3f, ttl %ss", max_entries, step, ttl_seconds)
+
+    def key(self, features: Dict[str, Any]) -> Tuple:
+        return tuple(sorted(
+            (k, _quantize(v, self.step)) for k, v in features.items()
+            if isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+        ))
+
+    def get(self, key: Tuple) -> Optional[Tuple[float, str, Dict[str, float]]]:
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Tuple, score: float, attack_type: str, feature_importance: Dict[str, float]) -> None:
+        self.entries[key] = (time.monotonic(), (score, attack_type, feature_importance))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
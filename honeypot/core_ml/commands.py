@@ -0,0 +1,130 @@
+import logging
+import json
+import math
+import re
+import sys
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUSPICIOUS_BINARIES = [
+    'wget', 'curl', 'chmod', 'chown', 'passwd', 'rm', 'mv', 'tar', 'nc', 'ncat', 'telnet',
+    'su', 'sudo', 'ssh', 'ftp', 'tftp', 'uname', 'id', 'useradd', 'busybox', 'crontab',
+]
+
+# Command position: start of line or after a shell separator / sudo
+_CMD_POS = r"(?:^|[;&|`(]\s*|\$\(\s*|\bsudo\s+)"
+# Command lines are attacker-controlled: only this many characters are matched,
+# and rules use bounded gaps so each one stays linear in the line length
+MAX_COMMAND_LENGTH = 2048
+
+DEFAULT_RULES: List[Dict[str, str]] = [
+    {'name': 'suspicious_binary', 'pattern': _CMD_POS + r"(?:" + "|".join(SUSPICIOUS_BINARIES) + r")\b"},
+    {'name': 'download_and_execute', 'pattern': r"\b(?:wget|curl|tftp|ftpget)\b.{0,256}?\|\s{0,8}(?:ba|da|z)?sh\b"},
+    {'name': 'pipe_to_shell', 'pattern': r"\|\s{0,8}(?:ba|da|z)?sh\b"},
+    {'name': 'inline_interpreter', 'pattern': r"\b(?:python[23]?|perl|ruby|php|node)\s+-[ce]\b"},
+    {'name': 'code_exec_call', 'pattern': r"\bos\.system\b|\bsubprocess\b|\bexec\(|\beval\(|\bbase64\s+(?:-d|--decode)\b"},
+    {'name': 'destructive', 'pattern': r"\brm\s+-[a-zA-Z]{0,16}(?:rf|fr)|\bmkfs\b|\bdd\s+if="},
+    {'name': 'permission_change', 'pattern': r"\bchmod\s+(?:[0-7]{0,4}7[0-7]{0,4}|[ugoa]{0,4}\+[rwx]{0,3}x)\b"},
+    {'name': 'reverse_shell', 'pattern': r"/dev/tcp/|\bn(?:c|cat)\b[^|;]{0,128}?\s-[a-zA-Z]{0,8}[el]"},
+    {'name': 'sensitive_file', 'pattern': r"/etc/(?:shadow|passwd|sudoers)\b|authorized_keys"},
+    {'name': 'account_change', 'pattern': r"\b(?:useradd|usermod|adduser|passwd)\b"},
+    {'name': 'web_defacement', 'pattern': r">\s{0,8}/var/www/"},
+]
+
+
+def load_rules(path: Optional[str]) -> List[Dict[str, str]]:
+    """
+    Load matcher rules from a JSON file containing a list of {"name": ..., "pattern": ...}
+    objects. Falls back to DEFAULT_RULES when no path is given.
+    """
+    if not path:
+        return DEFAULT_RULES
+    with open(path, 'r') as f:
+        rules = json.load(f)
+    if not isinstance(rules, list) or not all(isinstance(r, dict) and 'name' in r and 'pattern' in r for r in rules):
+        raise ValueError(f"Command rules in {path} must be a list of objects with 'name' and 'pattern'")
+    logger.info("Loaded %d command rules from %s", len(rules), path)
+    return rules
+
+
+class CommandMatcher:
+    """
+    Matches full command lines against all rules with one precompiled regex.
+    Each rule becomes an optional lookahead with its own named group, so a single
+    match() call reports every rule that occurs anywhere in the line, including
+    overlapping ones. Lines are truncated to max_length before matching.
+    """
+    def __init__(self, rules: Optional[Sequence[Dict[str, str]]] = None, max_length: int = MAX_COMMAND_LENGTH):
+        self.max_length = max_length
+        rules = list(rules if rules is not None else DEFAULT_RULES)
+        self.rule_names = [r['name'] for r in rules]
+        parts = []
+        for i, rule in enumerate(rules):
+            re.compile(rule['pattern'])  # fail early with the offending rule
+            parts.append(f"(?=.*?(?P<r{i}>{rule['pattern']}))?")
+        self.regex = re.compile("".join(parts), re.DOTALL | re.IGNORECASE)
+
+    def match(self, command: str) -> List[str]:
+        """
+        Names of all rules matching the command line.
+        """
+        if not command:
+            return []
+        m = self.regex.match(command[:self.max_length])
+        return [self.rule_names[int(k[1:])] for k, v in m.groupdict().items() if v is not None]
+
+
+class CommandFeatureCache:
+    """
+    Bounded LRU memo from an interned command tuple to its command features.
+    Bot sessions replay identical scripts, so most lookups are hits.
+    """
+    def __init__(self, matcher: CommandMatcher, max_entries: int = 4096):
+        self.matcher = matcher
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[str, ...], Dict[str, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def features(self, commands: Sequence[Any]) -> Dict[str, float]:
+        key = tuple(sys.intern(c) if isinstance(c, str) else str(c) for c in commands)
+        cached = self.entries.get(key)
+        if cached is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(cached)
+        self.misses += 1
+        result = self._compute(key)
+        self.entries[key] = result
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return dict(result)
+
+    def _compute(self, commands: Tuple[str, ...]) -> Dict[str, float]:
+        total = len(commands)
+        matches = [self.matcher.match(cmd) for cmd in commands]
+        suspicious = sum(1 for m in matches if m)
+        features = {
+            'unique_commands': len(set(commands)),
+            'total_commands': total,
+            'suspicious_command_count': suspicious,
+            'suspicious_rule_hits': len({name for m in matches for name in m}),
+            'proportion_suspicious_commands': suspicious / total if total else 0,
+        }
+        if commands:
+            freq = Counter(commands)
+            features['command_entropy'] = sum((count / total) * math.log2(total / count) for count in freq.values())
+        else:
+            features['command_entropy'] = 0
+        return features
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
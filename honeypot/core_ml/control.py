@@ -0,0 +1,91 @@
+import logging
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# handler(path, query, body) -> (HTTP status, JSON-serializable response)
+RouteHandler = Callable[[str, Dict[str, List[str]], Any], Tuple[int, Any]]
+
+
+class ControlServer:
+    """
+    Small local HTTP/JSON control endpoint running on a daemon thread.
+    Routes are matched on method and path prefix; the longest prefix wins.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765):
+        self.host = host
+        self.port = port
+        self.routes: Dict[str, Dict[str, RouteHandler]] = {'GET': {}, 'POST': {}}
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def add_route(self, method: str, prefix: str, handler: RouteHandler) -> None:
+        self.routes[method.upper()][prefix] = handler
+
+    def _resolve(self, method: str, path: str) -> Optional[RouteHandler]:
+        matches = [p for p in self.routes.get(method, {}) if path == p or path.startswith(p.rstrip('/') + '/')]
+        if not matches:
+            return None
+        return self.routes[method][max(matches, key=len)]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _dispatch(self, method: str) -> None:
+                parts = urlsplit(self.path)
+                handler = server._resolve(method, parts.path)
+                if handler is None:
+                    self._reply(404, {'error': f"no route for {method} {parts.path}"})
+                    return
+                body = None
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    try:
+                        body = json.loads(self.rfile.read(length))
+                    except ValueError:
+                        self._reply(400, {'error': 'request body must be JSON'})
+                        return
+                try:
+                    status, payload = handler(parts.path, parse_qs(parts.query), body)
+                except Exception as e:
+                    logger.error("Control route %s %s failed: %s", method, parts.path, e)
+                    status, payload = 500, {'error': str(e)}
+                self._reply(status, payload)
+
+            def _reply(self, status: int, payload: Any) -> None:
+                data = json.dumps(payload, default=str).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def log_message(self, format, *args):
+                logger.debug("Control request: " + format, *args)
+
+        return Handler
+
+    def start(self) -> None:
+        self.server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="control-server", daemon=True)
+        self.thread.start()
+        logger.info("Control endpoint listening on http://%s:%d", self.host, self.port)
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
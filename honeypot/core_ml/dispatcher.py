@@ -0,0 +1,347 @@
+import logging
+import http.client
+import json
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+BLOCK_ACTIONS = {'temp_block', 'perm_block'}
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter. acquire() blocks the calling worker, never the producer.
+    A rate of zero or less disables limiting.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HTTPConnectionPool:
+    """
+    Keep-alive HTTP(S) connections pooled per origin.
+    """
+    def __init__(self, max_per_origin: int = 4, timeout: float = 10.0):
+        self.max_per_origin = max_per_origin
+        self.timeout = timeout
+        self.pools: Dict[Tuple[str, str, int], queue.LifoQueue] = {}
+        self.lock = threading.Lock()
+
+    def _pool(self, origin: Tuple[str, str, int]) -> queue.LifoQueue:
+        with self.lock:
+            if origin not in self.pools:
+                self.pools[origin] = queue.LifoQueue(maxsize=self.max_per_origin)
+            return self.pools[origin]
+
+    def _connect(self, origin: Tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = origin
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    @staticmethod
+    def _send(conn: http.client.HTTPConnection, path: str, body: bytes,
+              headers: Dict[str, str]) -> http.client.HTTPResponse:
+        conn.request('POST', path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response
+
+    def post_json(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> int:
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        body = json.dumps(payload, default=str).encode('utf-8')
+        request_headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        request_headers.update(headers or {})
+        pool = self._pool(origin)
+        try:
+            conn = pool.get_nowait()
+            reused = True
+        except queue.Empty:
+            conn = self._connect(origin)
+            reused = False
+        try:
+            response = self._send(conn, path, body, request_headers)
+        except (ConnectionError, http.client.BadStatusLine):
+            conn.close()
+            if not reused:
+                raise
+            # The server closed the idle keep-alive connection before this request
+            # reached it: retry once on a fresh connection, not as a failed delivery
+            conn = self._connect(origin)
+            try:
+                response = self._send(conn, path, body, request_headers)
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return response.status
+
+    def close(self) -> None:
+        with self.lock:
+            pools = list(self.pools.values())
+        for pool in pools:
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+class Destination:
+    """
+    An alert channel. kind is 'webhook' or 'email'; only_blocks restricts it to block actions.
+    """
+    def __init__(self, name: str, kind: str, target: str, rate: float = 1.0, burst: int = 5,
+                 only_blocks: bool = False, headers: Optional[Dict[str, str]] = None):
+        if kind not in ('webhook', 'email'):
+            raise ValueError(f"Unsupported destination kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.target = target
+        self.only_blocks = only_blocks
+        self.headers = headers or {}
+        self.limiter = TokenBucket(rate, burst)
+        self.queue: queue.Queue = queue.Queue(maxsize=1000)
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def accepts(self, actions: Iterable[str]) -> bool:
+        return not self.only_blocks or bool(BLOCK_ACTIONS.intersection(actions))
+
+
+class _Digest:
+    __slots__ = ('ip', 'attack_type', 'actions', 'max_score', 'count', 'reported', 'first_seen', 'last_seen',
+                 'context')
+
+    def __init__(self, ip: str, attack_type: str, now: float):
+        self.ip = ip
+        self.attack_type = attack_type
+        self.actions: List[str] = []
+        self.max_score = 0.0
+        self.count = 0
+        self.reported = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.context: Dict[str, Any] = {}
+
+    def payload(self, kind: str) -> Dict[str, Any]:
+        return {
+            'type': kind,
+            'ip': self.ip,
+            'attack_type': self.attack_type,
+            # Copy: submit() keeps extending the list while a worker serializes the payload
+            'actions': list(self.actions),
+            'max_score': self.max_score,
+            'count': self.count - self.reported if kind == 'digest' else 1,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'location': self.context.get('location', 'Unknown'),
+        }
+
+
+class ActionDispatcher:
+    """
+    Delivers block/alert actions asynchronously. submit() only records the
+    decision; a flusher thread sends the first occurrence of each (IP, attack type)
+    immediately and folds repeats within digest_seconds into one digest message.
+    Each destination has its own worker, rate limit and bounded queue, and HTTP
+    destinations share a keep-alive connection pool.
+    """
+    def __init__(self, destinations: List[Destination], digest_seconds: float = 60.0,
+                 max_pending: int = 10000, max_retries: int = 3, backoff_seconds: float = 1.0,
+                 flush_interval: float = 1.0, smtp_settings: Optional[Dict[str, Any]] = None):
+        self.destinations = destinations
+        self.digest_seconds = digest_seconds
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.flush_interval = flush_interval
+        self.smtp_settings = smtp_settings or {}
+        self.http = HTTPConnectionPool()
+        self.pending: Dict[Tuple[str, str], _Digest] = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.threads = [threading.Thread(target=self._flush_loop, name="dispatch-flusher", daemon=True)]
+        for dest in destinations:
+            self.threads.append(threading.Thread(target=self._worker, args=(dest,),
+                                                 name=f"dispatch-{dest.name}", daemon=True))
+        for t in self.threads:
+            t.start()
+        logger.info("ActionDispatcher started with destinations: %s", [d.name for d in destinations])
+
+    def submit(self, ip: str, attack_type: str, actions: List[str], score: float,
+               context: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Record a decision for delivery. Never blocks; returns False if it was dropped.
+        """
+        if not self.destinations:
+            return False
+        now = time.time()
+        key = (ip, attack_type)
+        with self.lock:
+            self.submitted += 1
+            digest = self.pending.get(key)
+            if digest is None:
+                if len(self.pending) >= self.max_pending:
+                    self.dropped += 1
+                    return False
+                digest = self.pending[key] = _Digest(ip, attack_type, now)
+            else:
+                self.coalesced += 1
+            digest.count += 1
+            digest.last_seen = now
+            digest.max_score = max(digest.max_score, score)
+            for action in actions:
+                if action not in digest.actions:
+                    digest.actions.append(action)
+            if context:
+                digest.context = {'location': context.get('location', 'Unknown')}
+        return True
+
+    def _flush_loop(self) -> None:
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self, force: bool = False) -> None:
+        now = time.time()
+        outgoing = []
+        with self.lock:
+            for key, digest in list(self.pending.items()):
+                if digest.reported == 0:
+                    outgoing.append((digest.actions, digest.payload('alert')))
+                    digest.reported = 1
+                if force or now - digest.first_seen >= self.digest_seconds:
+                    if digest.count > digest.reported:
+                        outgoing.append((digest.actions, digest.payload('digest')))
+                    del self.pending[key]
+        for actions, payload in outgoing:
+            self._enqueue(actions, payload)
+
+    def _enqueue(self, actions: List[str], payload: Dict[str, Any]) -> None:
+        for dest in self.destinations:
+            if not dest.accepts(actions):
+                continue
+            try:
+                dest.queue.put_nowait(payload)
+            except queue.Full:
+                dest.dropped += 1
+
+    def _worker(self, dest: Destination) -> None:
+        while not (self.stop_event.is_set() and dest.queue.empty()):
+            try:
+                payload = dest.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                dest.limiter.acquire()
+                self._deliver(dest, payload)
+            finally:
+                dest.queue.task_done()
+
+    def _deliver(self, dest: Destination, payload: Dict[str, Any]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                if dest.kind == 'webhook':
+                    status = self.http.post_json(dest.target, payload, dest.headers)
+                    if status < 300:
+                        dest.sent += 1
+                        return
+                    if status < 500 and status != 429:
+                        logger.error("Destination %s rejected %s for %s with HTTP %d",
+                                     dest.name, payload['type'], payload['ip'], status)
+                        dest.failed += 1
+                        return
+                    raise IOError(f"HTTP {status}")
+                self._send_email(dest, payload)
+                dest.sent += 1
+                return
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    logger.error("Giving up delivering %s for %s to %s after %d attempts: %s",
+                                 payload['type'], payload['ip'], dest.name, attempt + 1, e)
+                    dest.failed += 1
+                    return
+                delay = self.backoff_seconds * (2 ** attempt)
+                logger.warning("Delivery to %s failed (%s), retrying in %.1fs", dest.name, e, delay)
+                time.sleep(delay)
+
+    def _send_email(self, dest: Destination, payload: Dict[str, Any]) -> None:
+        msg = EmailMessage()
+        prefix = "Attack digest" if payload['type'] == 'digest' else "Attack alert"
+        msg['Subject'] = f"[honeypot] {prefix}: {payload['attack_type']} from {payload['ip']} (x{payload['count']})"
+        msg['From'] = self.smtp_settings.get('sender', 'honeypot@localhost')
+        msg['To'] = dest.target
+        msg.set_content(json.dumps(payload, indent=2, default=str))
+        host = self.smtp_settings.get('host', 'localhost')
+        port = int(self.smtp_settings.get('port', 25))
+        with smtplib.SMTP(host, port, timeout=10) as smtp:
+            if self.smtp_settings.get('starttls'):
+                smtp.starttls()
+            if self.smtp_settings.get('user'):
+                smtp.login(self.smtp_settings['user'], self.smtp_settings.get('password', ''))
+            smtp.send_message(msg)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'pending_digests': pending,
+            'destinations': {d.name: {'sent': d.sent, 'failed': d.failed, 'dropped': d.dropped,
+                                      'queued': d.queue.qsize()} for d in self.destinations},
+        }
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Flush open digests and wait up to timeout seconds for queued deliveries.
+        """
+        self.flush(force=True)
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for t in self.threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        self.http.close()
+        logger.info("ActionDispatcher stopped: %s", self.stats())
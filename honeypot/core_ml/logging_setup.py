@@ -0,0 +1,197 @@
+import logging
+import atexit
+import json
+import queue
+import random
+import threading
+import time
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+# Pass as extra= on records emitted once per processed log
+PER_EVENT = {'per_event': True}
+# Structured per-event records and per-event summaries; only enabled in async mode
+EVENT_LOGGER = "honeypot.events"
+
+# Sampling filter installed by configure_logging in async mode
+_sampler: Optional['EventSamplingFilter'] = None
+
+
+class LazyJSON:
+    """
+    Defers JSON encoding of a structured payload until a handler formats the record.
+    """
+    __slots__ = ('payload',)
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+
+    def __str__(self) -> str:
+        return json.dumps(self.payload, default=str)
+
+
+def begin_event() -> bool:
+    """
+    Start a processed event on the calling thread and decide once whether all of
+    its per-event records are kept. Returns the decision (always True in sync mode).
+    """
+    if _sampler is None:
+        return True
+    return _sampler.begin_event()
+
+
+class EventSamplingFilter(logging.Filter):
+    """
+    Lets WARNING and above and all non-per-event records through unchanged.
+    Per-event records are counted by message template and kept only for events
+    sampled in begin_event(), so a sampled event keeps all of its records.
+    Records are never formatted here, so dropped records cost no formatting.
+    """
+    def __init__(self, sample_rate: float = 0.01, aggregate_seconds: float = 60.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.aggregate_seconds = aggregate_seconds
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.counts: Counter = Counter()
+        self.events = 0
+        self.sampled = 0
+        self.window_start = time.monotonic()
+
+    def begin_event(self) -> bool:
+        keep = self.sample_rate >= 1 or random.random() < self.sample_rate
+        self.local.keep = keep
+        with self.lock:
+            self.events += 1
+            self.sampled += keep
+        return keep
+
+    def current(self) -> bool:
+        keep = getattr(self.local, 'keep', None)
+        if keep is None:
+            # Per-event record outside any event: decide for the record alone
+            return self.sample_rate >= 1 or random.random() < self.sample_rate
+        return keep
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, 'per_event', False):
+            return True
+        with self.lock:
+            self.counts[record.msg] += 1
+        return self.current()
+
+    def seconds_until_summary(self) -> float:
+        return self.window_start + self.aggregate_seconds - time.monotonic()
+
+    def take_summary(self) -> Optional[logging.LogRecord]:
+        """
+        Summary record for the current window, or None if it had no per-event
+        records; either way a new window starts.
+        """
+        with self.lock:
+            elapsed = time.monotonic() - self.window_start
+            counts, events, sampled = self.counts, self.events, self.sampled
+            self.counts = Counter()
+            self.events = self.sampled = 0
+            self.window_start = time.monotonic()
+        if not counts:
+            return None
+        return logging.LogRecord(
+            EVENT_LOGGER, logging.INFO, __file__, 0,
+            "Per-event logging over last %.1fs: %d events, %d sampled (rate %.3f), %d records; by message: %s",
+            (elapsed, events, sampled, self.sample_rate, sum(counts.values()), counts.most_common(10)), None
+        )
+
+
+class SummarizingQueueListener(QueueListener):
+    """
+    QueueListener that also emits the sampler's summary every aggregate_seconds
+    from its own thread, so idle periods are still flushed.
+    """
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler, sampler: EventSamplingFilter,
+                 respect_handler_level: bool = True):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.sampler = sampler
+
+    def dequeue(self, block: bool) -> Any:
+        if not block:
+            return self.queue.get_nowait()
+        while True:
+            remaining = self.sampler.seconds_until_summary()
+            if remaining <= 0:
+                summary = self.sampler.take_summary()
+                if summary is not None:
+                    self.handle(summary)
+                continue
+            try:
+                return self.queue.get(timeout=remaining)
+            except queue.Empty:
+                continue
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the caller on INFO and below: when the queue
+    is full those records are dropped and counted. Warnings and errors wait for room.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(mode: str = "sync", log_file: str = "attack_detection.log", level: int = logging.INFO,
+                      sample_rate: float = 0.01, aggregate_seconds: float = 60.0,
+                      queue_size: int = 10000) -> Optional[QueueListener]:
+    """
+    Configure root logging. "sync" writes to the file and console handlers on the
+    calling thread. "async" moves handler I/O to a QueueListener thread and
+    samples per-event records. Returns the listener in async mode.
+    """
+    handlers: List[logging.Handler] = [logging.FileHandler(log_file), logging.StreamHandler()]
+    if mode != "async":
+        logging.basicConfig(level=level, format=LOG_FORMAT, handlers=handlers)
+        logging.getLogger(EVENT_LOGGER).setLevel(logging.WARNING)
+        return None
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    global _sampler
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = BoundedQueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    _sampler = EventSamplingFilter(sample_rate=sample_rate, aggregate_seconds=aggregate_seconds)
+    queue_handler.addFilter(_sampler)
+    logging.basicConfig(level=level, handlers=[queue_handler])
+    listener = SummarizingQueueListener(log_queue, *handlers, sampler=_sampler)
+    listener.start()
+
+    def _shutdown():
+        listener.stop()
+        final = [_sampler.take_summary()]
+        if queue_handler.dropped:
+            final.append(logging.makeLogRecord({
+                'levelno': logging.WARNING, 'levelname': 'WARNING', 'name': __name__,
+                'msg': "Dropped %d low-severity log records while the log queue was full",
+                'args': (queue_handler.dropped,)}))
+        for record in final:
+            if record is not None:
+                for handler in handlers:
+                    handler.handle(record)
+
+    atexit.register(_shutdown)
+    logging.getLogger(__name__).info(
+        "Asynchronous logging enabled: per-event sample rate %.3f, summaries every %.0fs", sample_rate, aggregate_seconds)
+    return listener
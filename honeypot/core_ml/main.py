@@ -1,4 +1,6 @@
 import time 
+import queue
+import threading
 import joblib
 from dotenv import load_dotenv
 import os
@@ -10,6 +12,18 @@ from Feature import FeatureExtractor
 from model import AdaptiveAttackDetector
 from response import ResponseEngine
 from Performance_Checker import PerformanceMonitor
+from sketch import StreamAggregator
+from commands import CommandMatcher, load_rules
+from coalesce import EventCoalescer, ScoreCache
+from blocklist import Blocklist
+from dispatcher import ActionDispatcher, Destination
+from memory import MemoryBudget
+from control import ControlServer
+from profiling import ProfilingHooks
+from archive import EventArchive
+from admission import AdmissionController
+from profiles import ThreatProfileStore
+from logging_setup import configure_logging, begin_event, EVENT_LOGGER, PER_EVENT, LazyJSON
 
 # Configuration
 load_dotenv()
@@ -17,14 +31,83 @@ load_dotenv()
 THRESHOLD = float(os.getenv("THRESHOLD", 0.0))
 # Report every 10 logs
 REPORT_INTERVAL = int(os.getenv("REPORT_INTERVAL", 10))
+# Counter-only stats covering blocked, shed and coalesced events too (0 disables)
+STATS_INTERVAL_SECONDS = float(os.getenv("STATS_INTERVAL_SECONDS", 60))
 MODEL_PATH = os.getenv("MODEL_PATH", "model.pkl")
+# Sliding-window sketch settings for per-IP rate features (0 disables)
+RATE_WINDOW_SECONDS = int(os.getenv("RATE_WINDOW_SECONDS", 60))
+RATE_WINDOW_BUCKETS = int(os.getenv("RATE_WINDOW_BUCKETS", 6))
+SKETCH_CMS_WIDTH = int(os.getenv("SKETCH_CMS_WIDTH", 2048))
+SKETCH_CMS_DEPTH = int(os.getenv("SKETCH_CMS_DEPTH", 4))
+SKETCH_HLL_PRECISION = int(os.getenv("SKETCH_HLL_PRECISION", 10))
+HEAVY_HITTERS_K = int(os.getenv("HEAVY_HITTERS_K", 20))
+HEAVY_HITTER_FRACTION = float(os.getenv("HEAVY_HITTER_FRACTION", 0.1))
+# Command-line matcher rules (JSON list of {"name", "pattern"}; unset uses built-in rules)
+COMMAND_RULES_PATH = os.getenv("COMMAND_RULES_PATH")
+COMMAND_CACHE_SIZE = int(os.getenv("COMMAND_CACHE_SIZE", 4096))
+# Coalescing of equivalent per-IP events and quantized score cache (0 disables)
+COALESCE_WINDOW_SECONDS = float(os.getenv("COALESCE_WINDOW_SECONDS", 5))
+COALESCE_MAX_IPS = int(os.getenv("COALESCE_MAX_IPS", 10000))
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", 5000))
+SCORE_CACHE_STEP = float(os.getenv("SCORE_CACHE_STEP", 0.1))
+SCORE_CACHE_TTL = float(os.getenv("SCORE_CACHE_TTL", 300))
+# Blocklist fast path for IPs that already received a block action
+BLOCKLIST_PATH = os.getenv("BLOCKLIST_PATH", "blocklist.json")
+TEMP_BLOCK_SECONDS = float(os.getenv("TEMP_BLOCK_SECONDS", 3600))
+# Comma-separated IPs or CIDR ranges to block permanently at startup
+BLOCK_CIDRS = [c.strip() for c in os.getenv("BLOCK_CIDRS", "").split(",") if c.strip()]
+# Alert/block delivery channels (unset URLs/addresses disable the channel)
+ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL")
+BLOCK_WEBHOOK_URL = os.getenv("BLOCK_WEBHOOK_URL")
+ALERT_EMAIL_TO = os.getenv("ALERT_EMAIL_TO")
+# Deliveries per second per channel (0 disables rate limiting)
+ALERT_RATE_PER_SECOND = float(os.getenv("ALERT_RATE_PER_SECOND", 1))
+ALERT_DIGEST_SECONDS = float(os.getenv("ALERT_DIGEST_SECONDS", 60))
+# Memory budget for the detector and response engine in MiB (0 disables enforcement)
+MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", 0))
+MEMORY_CHECK_SECONDS = float(os.getenv("MEMORY_CHECK_SECONDS", 300))
+MAX_TREE_MIB = float(os.getenv("MAX_TREE_MIB", 0))
+MAX_TRACKED_FEATURES = int(os.getenv("MAX_TRACKED_FEATURES", 50))
+RESPONSE_HISTORY_LIMIT = int(os.getenv("RESPONSE_HISTORY_LIMIT", 10))
+# Local control endpoint (0 disables) and on-demand profiling output
+CONTROL_HOST = os.getenv("CONTROL_HOST", "127.0.0.1")
+CONTROL_PORT = int(os.getenv("CONTROL_PORT", 0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", 30))
+# Columnar archive of scored events (empty disables)
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_FLUSH_ROWS = int(os.getenv("ARCHIVE_FLUSH_ROWS", 1000))
+ARCHIVE_FLUSH_SECONDS = float(os.getenv("ARCHIVE_FLUSH_SECONDS", 60))
+# Ingest queue between the change stream and scoring, and overload shedding (0 disables shedding)
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 5000))
+SHED_HIGH_WATERMARK = int(os.getenv("SHED_HIGH_WATERMARK", 1000))
+SHED_LOW_WATERMARK = int(os.getenv("SHED_LOW_WATERMARK", 100))
+SHED_MAX_LAG_SECONDS = float(os.getenv("SHED_MAX_LAG_SECONDS", 30))
+SHED_MIN_KEEP_RATIO = float(os.getenv("SHED_MIN_KEEP_RATIO", 0.05))
+# Per-IP threat profiles served at /ip/<address> and /ips on the control endpoint
+THREAT_PROFILE_MAX = int(os.getenv("THREAT_PROFILE_MAX", 100000))
+THREAT_PROFILE_PATH = os.getenv("THREAT_PROFILE_PATH", "threat_profiles.json")
+# Snapshots are written by a background thread (0 writes only at shutdown)
+THREAT_PROFILE_SNAPSHOT_SECONDS = float(os.getenv("THREAT_PROFILE_SNAPSHOT_SECONDS", 300))
+# "sync" logs on the detection thread; "async" hands records to a background
+# listener, samples per-event records and logs periodic per-event summaries
+LOG_MODE = os.getenv("LOG_MODE", "sync").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.01))
+LOG_AGGREGATE_SECONDS = float(os.getenv("LOG_AGGREGATE_SECONDS", 60))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+SMTP_SETTINGS = {
+    'host': os.getenv("SMTP_HOST", "localhost"),
+    'port': int(os.getenv("SMTP_PORT", 25)),
+    'sender': os.getenv("SMTP_FROM", "honeypot@localhost"),
+    'user': os.getenv("SMTP_USER"),
+    'password': os.getenv("SMTP_PASSWORD"),
+    'starttls': os.getenv("SMTP_STARTTLS", "false").lower() == "true",
+}
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[logging.FileHandler("attack_detection.log"), logging.StreamHandler()]
-)
+configure_logging(LOG_MODE, "attack_detection.log", sample_rate=LOG_SAMPLE_RATE,
+                  aggregate_seconds=LOG_AGGREGATE_SECONDS, queue_size=LOG_QUEUE_SIZE)
 logger = logging.getLogger(__name__)
+event_logger = logging.getLogger(EVENT_LOGGER)
 
 # Global dictionary to track last seen time per IP for interarrival calculation
 last_seen = {}
@@ -54,10 +137,10 @@ def initialize_model(feature_extractor):
                         else:
                             interarrival = 100  # assume high if first occurrence
                         last_seen[ip] = current_time
-                        
+                
                         features = feature_extractor.transform(log)
                         features['interarrival_time'] = interarrival
-                        
+                
                         # Heuristic labeling:
                         if features.get('commands') and len(features.get('commands')) > 0:
                             label = 'command_injection'
@@ -66,7 +149,7 @@ def initialize_model(feature_extractor):
                                 label = 'brute_force'
                             else:
                                 label = 'suspicious'
-                        
+                
                         detector.process_log(features)
                         detector.train_classifier([features], [label])
                     except Exception as e:
@@ -76,6 +159,106 @@ def initialize_model(feature_extractor):
             logger.error("Failed to initialize with historical data: %s", str(e))
     return detector
 
+def build_aggregator():
+    if RATE_WINDOW_SECONDS <= 0:
+        return None
+    return StreamAggregator(
+        window_seconds=RATE_WINDOW_SECONDS,
+        buckets=RATE_WINDOW_BUCKETS,
+        cms_width=SKETCH_CMS_WIDTH,
+        cms_depth=SKETCH_CMS_DEPTH,
+        hll_precision=SKETCH_HLL_PRECISION,
+        top_k=HEAVY_HITTERS_K,
+        heavy_hitter_fraction=HEAVY_HITTER_FRACTION
+    )
+
+def build_coalescer():
+    if COALESCE_WINDOW_SECONDS <= 0:
+        return None
+    return EventCoalescer(window_seconds=COALESCE_WINDOW_SECONDS, max_ips=COALESCE_MAX_IPS)
+
+def build_score_cache():
+    if SCORE_CACHE_SIZE <= 0:
+        return None
+    return ScoreCache(max_entries=SCORE_CACHE_SIZE, step=SCORE_CACHE_STEP, ttl_seconds=SCORE_CACHE_TTL)
+
+def build_blocklist():
+    blocklist = Blocklist(path=BLOCKLIST_PATH, temp_block_seconds=TEMP_BLOCK_SECONDS)
+    for cidr in BLOCK_CIDRS:
+        try:
+            blocklist.block(cidr)
+        except ValueError as e:
+            logger.warning("Ignoring invalid BLOCK_CIDRS entry %s: %s", cidr, str(e))
+    return blocklist
+
+def update_blocklist(blocklist, ip, actions, attack_type, location):
+    """
+    Block the IP if the actions call for it. Returns the block entry, or None.
+    """
+    try:
+        if 'perm_block' in actions:
+            return blocklist.block(ip, attack_type=attack_type, location=location)
+        if 'temp_block' in actions:
+            return blocklist.block_temporarily(ip, attack_type=attack_type, location=location)
+    except ValueError as e:
+        # e.g. a log without a usable source_ip; the rest of the event is still handled
+        logger.warning("Cannot block %s: %s", ip, str(e))
+    return None
+
+def build_dispatcher():
+    destinations = []
+    if ALERT_WEBHOOK_URL:
+        destinations.append(Destination('webhook', 'webhook', ALERT_WEBHOOK_URL, rate=ALERT_RATE_PER_SECOND))
+    if BLOCK_WEBHOOK_URL:
+        destinations.append(Destination('block_webhook', 'webhook', BLOCK_WEBHOOK_URL,
+                                        rate=ALERT_RATE_PER_SECOND, only_blocks=True))
+    if ALERT_EMAIL_TO:
+        destinations.append(Destination('email', 'email', ALERT_EMAIL_TO, rate=ALERT_RATE_PER_SECOND))
+    if not destinations:
+        return None
+    return ActionDispatcher(destinations, digest_seconds=ALERT_DIGEST_SECONDS, smtp_settings=SMTP_SETTINGS)
+
+def build_memory_budget():
+    if MEMORY_BUDGET_MB <= 0:
+        return None
+    return MemoryBudget(int(MEMORY_BUDGET_MB * 2 ** 20), max_features=MAX_TRACKED_FEATURES,
+                        history_limit=RESPONSE_HISTORY_LIMIT, check_seconds=MEMORY_CHECK_SECONDS)
+
+def build_control_server():
+    if CONTROL_PORT <= 0:
+        return None
+    return ControlServer(host=CONTROL_HOST, port=CONTROL_PORT)
+
+def build_archive():
+    if not ARCHIVE_DIR:
+        return None
+    return EventArchive(root=ARCHIVE_DIR, flush_rows=ARCHIVE_FLUSH_ROWS, flush_seconds=ARCHIVE_FLUSH_SECONDS)
+
+def build_admission_controller():
+    if SHED_HIGH_WATERMARK <= 0:
+        return None
+    return AdmissionController(high_watermark=SHED_HIGH_WATERMARK, low_watermark=SHED_LOW_WATERMARK,
+                               max_lag_seconds=SHED_MAX_LAG_SECONDS, min_keep_ratio=SHED_MIN_KEEP_RATIO)
+
+def stream_reader(db, ingest, stop_event):
+    """
+    Pump change-stream events into the bounded ingest queue, reconnecting on errors.
+    A full queue blocks the reader, leaving the backlog in MongoDB.
+    """
+    resume_token = None
+    while not stop_event.is_set():
+        try:
+            for change in db.stream_logs(resume_token):
+                if isinstance(change, dict):
+                    resume_token = change.get('token', resume_token)
+                    change['enqueued_at'] = time.monotonic()
+                ingest.put(change)
+                if stop_event.is_set():
+                    return
+        except Exception as e:
+            logger.warning("Stream interrupted: %s. Reconnecting in 5 seconds...", str(e))
+            time.sleep(5)
+
 def save_model(detector):
     try:
         with open(MODEL_PATH, 'wb') as f:
@@ -89,102 +272,239 @@ def main():
         logger.info("Starting system initialization...")
         db = MongoDBHandler()
         logger.info("MongoDBHandler initialized.")
-        fe = FeatureExtractor()
+        aggregator = build_aggregator()
+        fe = FeatureExtractor(aggregator=aggregator,
+                              command_matcher=CommandMatcher(load_rules(COMMAND_RULES_PATH)),
+                              command_cache_size=COMMAND_CACHE_SIZE)
         logger.info("FeatureExtractor initialized.")
         model = initialize_model(fe)
+        if MAX_TREE_MIB > 0:
+            model.limit_tree_size(MAX_TREE_MIB)
         logger.info("AdaptiveAttackDetector initialized.")
-        responder = ResponseEngine()
+        responder = ResponseEngine(history_limit=RESPONSE_HISTORY_LIMIT)
         logger.info("ResponseEngine initialized.")
         monitor = PerformanceMonitor()
         logger.info("PerformanceMonitor initialized.")
-        resume_token = None
+        coalescer = build_coalescer()
+        score_cache = build_score_cache()
+        blocklist = build_blocklist()
+        logger.info("Blocklist initialized with %d entries.", len(blocklist))
+        dispatcher = build_dispatcher()
+        memory_budget = build_memory_budget()
+        archive = build_archive()
+        threat_profiles = ThreatProfileStore(max_profiles=THREAT_PROFILE_MAX, snapshot_path=THREAT_PROFILE_PATH,
+                                             snapshot_seconds=THREAT_PROFILE_SNAPSHOT_SECONDS)
+        profiler = ProfilingHooks(output_dir=PROFILE_DIR, default_seconds=PROFILE_SECONDS)
+        profiler.install_signal_handlers()
+        control = build_control_server()
+        if control is not None:
+            profiler.register_routes(control)
+            threat_profiles.register_routes(control)
+            control.start()
+        admission = build_admission_controller()
         logger.info("System initialized successfully.")
     except Exception as e:
         logger.critical("Failed to initialize system: %s", str(e))
         raise
 
+    def record_burst(burst):
+        # The burst's first event was recorded when scored; the rest count once, as its weight
+        if burst.weight > 1:
+            monitor.update(burst.score, True, true_label=None, weight=burst.weight - 1)
+            logger.info("Coalesced %d %s events from %s into one weighted event",
+                        burst.weight, burst.attack_type, burst.ip, extra=PER_EVENT)
+
+    def report():
+        try:
+            if memory_budget is not None and memory_budget.due():
+                usage = memory_budget.enforce(model, responder)
+                logger.info("Memory usage: %.1f/%.1f MiB (rss %s), components: %s",
+                            usage['total'] / 2 ** 20, usage['budget'] / 2 ** 20, usage['rss'],
+                            usage['components'])
+            save_model(model)
+            monitor.generate_report()
+            logger.info("Generated performance report after %d logs.", len(monitor.log_entries))
+            if aggregator is not None:
+                logger.info("Heavy hitters (window %ss): %s",
+                            RATE_WINDOW_SECONDS, aggregator.heavy_hitters.top(5))
+            blocklist.save()
+            logger.info("Blocklist: %d entries, %d fast-path hits", len(blocklist), blocklist.hits)
+            if dispatcher is not None:
+                logger.info("Dispatcher stats: %s", dispatcher.stats())
+            logger.info("Command feature cache stats: %s", fe.command_cache.stats())
+            if coalescer is not None:
+                logger.info("Coalescer stats: %s", coalescer.stats())
+            if score_cache is not None:
+                logger.info("Score cache stats: %s", score_cache.stats())
+            if admission is not None:
+                logger.info("Admission stats: %s", admission.stats())
+        except Exception as e:
+            logger.error("Error generating periodic report: %s", str(e))
+
+    def log_stats():
+        # Counters only: runs on every path, so nothing here may touch disk or the model
+        logger.info("Processed %d events, %d scored; blocklist fast-path hits %d", processed, scored, blocklist.hits)
+        if admission is not None:
+            logger.info("Admission stats: %s", admission.stats())
+        if coalescer is not None:
+            logger.info("Coalescer stats: %s", coalescer.stats())
+
+    # The full report (model save, plots) only counts scored events; blocked, shed and
+    # coalesced events must stay cheap, so they only contribute to the timed counter stats
+    processed = 0
+    scored = 0
+    next_report = REPORT_INTERVAL
+    next_stats = time.monotonic() + STATS_INTERVAL_SECONDS
+    ingest = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    stop_event = threading.Event()
+    reader = threading.Thread(target=stream_reader, args=(db, ingest, stop_event), name="stream-reader", daemon=True)
+    reader.start()
     try:
         while True:
             try:
-                for change in db.stream_logs(resume_token):
-                    if change is None:
-                        logger.warning("Received None from stream, skipping.")
-                        continue
-                    if not isinstance(change, dict):
-                        logger.error("Unexpected data structure from stream_logs: %s", type(change))
-                        continue
-                    log = change.get('log')
-                    resume_token = change.get('token')
-                    if log is None:
-                        logger.warning("Received log entry with missing 'log' field: %s", change)
-                        continue
-                    try:
-                        ip = log.get('source_ip', 'unknown')
-                        current_time = datetime.fromisoformat(log['timestamp'])
-                        if ip in last_seen:
-                            interarrival = (current_time - last_seen[ip]).total_seconds()
-                        else:
-                            interarrival = 100
-                        last_seen[ip] = current_time
-                        
-                        features = fe.transform(log)
-                        features['interarrival_time'] = interarrival
-                        
-                        # Use improved model: get anomaly score, attack type, and feature importance
-                        score, attack_type, feature_importance = model.process_log(features)
-                        is_attack = True  # All logs are malicious in this scenario
-                        monitor.update(score, is_attack, true_label=None)
-                        
-                        # Log top features for this anomaly
-                        top_features = list(feature_importance.items())[:5]
-                        logger.info(f"Top contributing features: {top_features}")
-                        
-                        try:
-                            location = fe.get_location(ip)
-                        except Exception as e:
-                            logger.warning("GeoIP lookup failed for IP %s: %s", ip, str(e))
-                            location = "Unknown"
-                        context = {"ip": ip, "location": location, "top_features": top_features}
-                        
-                        # Determine heuristic label
-                        if features.get('commands') and len(features.get('commands')) > 0:
-                            heuristic_label = 'command_injection'
-                        else:
-                            if interarrival < 3:
-                                heuristic_label = 'brute_force'
-                            else:
-                                heuristic_label = 'suspicious'
-                        
-                        # Override classifier prediction if it returns None or "normal"
-                        if attack_type is None or attack_type.lower() == "normal":
-                            attack_type = heuristic_label
-                        
-                        # Automatically update the classifier if it doesn't match the heuristic label
-                        if attack_type.lower() != heuristic_label.lower():
-                            model.train_classifier([features], [heuristic_label])
-                            logger.info("Auto-updated classifier: changed %s to %s for log from %s", 
-                                        attack_type, heuristic_label, ip)
-                            attack_type = heuristic_label
-                        
-                        actions = responder.determine_response(attack_type, score, context)
-                        logger.info("Detected attack from %s (score: %.2f, type: %s, interarrival: %.2f). Actions: %s",
-                                    ip, score, attack_type, interarrival, actions)
-                        success_rate = 0.75
-                        responder.update_strategy(attack_type, success_rate)
-                        
-                        if len(monitor.log_entries) % REPORT_INTERVAL == 0 and len(monitor.log_entries) > 0:
-                            save_model(model)
-                            monitor.generate_report()
-                            logger.info("Generated performance report after %d logs.", len(monitor.log_entries))
-                    except Exception as e:
-                        logger.error("Error processing log from %s: %s", log.get('source_ip', 'unknown') if log else 'unknown', str(e))
-                        continue
+                change = ingest.get(timeout=1)
+            except queue.Empty:
+                if admission is not None:
+                    admission.observe_load(0, 0.0)
+                continue
+            if change is None:
+                logger.warning("Received None from stream, skipping.")
+                continue
+            if not isinstance(change, dict):
+                logger.error("Unexpected data structure from stream_logs: %s", type(change))
+                continue
+            log = change.get('log')
+            if log is None:
+                logger.warning("Received log entry with missing 'log' field: %s", change)
+                continue
+            if admission is not None:
+                admission.observe_load(ingest.qsize(), time.monotonic() - change.get('enqueued_at', time.monotonic()))
+            processed += 1
+            # One sampling decision covers every per-event record this event produces
+            sampled = begin_event()
+            try:
+                ip = log.get('source_ip', 'unknown')
+                current_time = datetime.fromisoformat(log['timestamp'])
+                is_new_ip = ip not in last_seen
+                if not is_new_ip:
+                    interarrival = (current_time - last_seen[ip]).total_seconds()
+                else:
+                    interarrival = 100
+                last_seen[ip] = current_time
+                
+                # Already-blocked IPs only update counters and the CSV sink
+                block_entry = blocklist.lookup(ip)
+                if block_entry is not None:
+                    fe.observe(log, current_time)
+                    threat_profiles.update(ip, current_time, block=block_entry)
+                    responder.log_blocked(ip, block_entry)
+                    continue
+                
+                # Under overload, sampled-out low-risk events are only counted
+                if admission is not None and not admission.admit(log, is_new_ip):
+                    fe.observe(log, current_time)
+                    threat_profiles.update(ip, current_time)
+                    continue
+                
+                # Equivalent events inside an open burst reuse the burst's decision
+                burst = coalescer.absorb(ip, log, current_time) if coalescer is not None else None
+                if burst is not None:
+                    fe.observe(log, current_time)
+                    threat_profiles.update(ip, current_time, attack_type=burst.attack_type)
+                    continue
+                
+                scored += 1
+                features = fe.transform(log)
+                features['interarrival_time'] = interarrival
+                
+                # Use improved model: get anomaly score, attack type, and feature importance
+                cache_key = score_cache.key(features) if score_cache is not None else None
+                cached = score_cache.get(cache_key) if score_cache is not None else None
+                if cached is not None:
+                    score, attack_type, feature_importance = cached
+                else:
+                    score, attack_type, feature_importance = model.process_log(features)
+                is_attack = True  # All logs are malicious in this scenario
+                monitor.update(score, is_attack, true_label=None)
+                
+                # Log top features for this anomaly
+                top_features = list(feature_importance.items())[:5]
+                logger.info("Top contributing features: %s", top_features, extra=PER_EVENT)
+                
+                try:
+                    location = fe.get_location(ip)
+                except Exception as e:
+                    logger.warning("GeoIP lookup failed for IP %s: %s", ip, str(e))
+                    location = "Unknown"
+                context = {"ip": ip, "location": location, "top_features": top_features}
+                
+                # Determine heuristic label
+                if features.get('commands') and len(features.get('commands')) > 0:
+                    heuristic_label = 'command_injection'
+                else:
+                    if interarrival < 3:
+                        heuristic_label = 'brute_force'
+                    else:
+                        heuristic_label = 'suspicious'
+                
+                # Override classifier prediction if it returns None or "normal"
+                if attack_type is None or attack_type.lower() == "normal":
+                    attack_type = heuristic_label
+                
+                # Automatically update the classifier if it doesn't match the heuristic label
+                if attack_type.lower() != heuristic_label.lower():
+                    model.train_classifier([features], [heuristic_label])
+                    logger.info("Auto-updated classifier: changed %s to %s for log from %s", 
+                                attack_type, heuristic_label, ip, extra=PER_EVENT)
+                    attack_type = heuristic_label
+                if score_cache is not None and cached is None:
+                    score_cache.put(cache_key, score, attack_type, feature_importance)
+                
+                actions = responder.determine_response(attack_type, score, context)
+                logger.info("Detected attack from %s (score: %.2f, type: %s, interarrival: %.2f). Actions: %s",
+                            ip, score, attack_type, interarrival, actions, extra=PER_EVENT)
+                if sampled and event_logger.isEnabledFor(logging.INFO):
+                    event_logger.info("event %s", LazyJSON({
+                        'timestamp': current_time, 'ip': ip, 'score': score, 'attack_type': attack_type,
+                        'actions': actions, 'interarrival': interarrival, 'location': location,
+                        'cached': cached is not None, 'top_features': top_features}), extra=PER_EVENT)
+                block_entry = update_blocklist(blocklist, ip, actions, attack_type, location)
+                threat_profiles.update(ip, current_time, score=score, attack_type=attack_type, actions=actions,
+                                       location=location, block=block_entry)
+                if archive is not None:
+                    archive.append(current_time, ip, features, score, attack_type, actions)
+                if dispatcher is not None:
+                    dispatcher.submit(ip, attack_type, actions, score, context)
+                if coalescer is not None:
+                    for closed in coalescer.open(ip, log, current_time, score, attack_type, actions):
+                        record_burst(closed)
+                success_rate = 0.75
+                responder.update_strategy(attack_type, success_rate)
             except Exception as e:
-                logger.warning("Stream interrupted: %s. Reconnecting in 5 seconds...", str(e))
-                time.sleep(5)
+                logger.error("Error processing log from %s: %s", log.get('source_ip', 'unknown') if log else 'unknown', str(e))
+                continue
+            finally:
+                if scored >= next_report:
+                    report()
+                    next_report = scored + REPORT_INTERVAL
+                if STATS_INTERVAL_SECONDS > 0 and time.monotonic() >= next_stats:
+                    log_stats()
+                    next_stats = time.monotonic() + STATS_INTERVAL_SECONDS
     except KeyboardInterrupt:
         logger.info("Received shutdown signal. Saving final state...")
+        stop_event.set()
+        if coalescer is not None:
+            for closed in coalescer.close_all():
+                record_burst(closed)
         save_model(model)
+        blocklist.save()
+        threat_profiles.close()
+        if dispatcher is not None:
+            dispatcher.close()
+        if control is not None:
+            control.stop()
+        if archive is not None:
+            archive.close()
         monitor.generate_report()
         logger.info("Final performance report generated. System shutting down.")
 
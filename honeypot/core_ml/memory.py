@@ -0,0 +1,141 @@
+import logging
+import os
+import sys
+import time
+import types
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType, types.CodeType, logging.Logger)
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    Approximate retained size in bytes of an object graph, counting each object once.
+    Classes, modules, functions and loggers are shared state and are not counted.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        try:
+            total += sys.getsizeof(current)
+        except TypeError:
+            continue
+        if isinstance(current, (str, bytes, bytearray, int, float, bool)) or current is None:
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)) or isinstance(current, deque):
+            stack.extend(current)
+        if hasattr(current, '__dict__'):
+            stack.append(vars(current))
+        for slot in getattr(type(current), '__slots__', ()):
+            if hasattr(current, slot):
+                stack.append(getattr(current, slot))
+    return total
+
+
+def current_rss_bytes() -> Optional[int]:
+    """
+    Resident set size of this process, or None where it cannot be read.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is KiB on Linux and bytes on macOS; this is the peak, not current
+            return peak if sys.platform == 'darwin' else peak * 1024
+        except Exception:
+            return None
+
+
+class MemoryBudget:
+    """
+    Tracks per-component memory of the detector and response engine and applies
+    size-limiting policies once usage crosses soft_ratio of the total budget:
+    pruning feature importances, ring-buffering response history and capping
+    the Hoeffding tree size. Measuring walks every model, so enforcement runs at
+    most once per check_seconds (see due()).
+    """
+    # Components the policies can shrink; everything else (e.g. the fixed-size
+    # HalfSpaceTrees ensembles) counts against the budget as-is
+    SHRINKABLE = ('detector.classifier', 'detector.feature_importance')
+
+    def __init__(self, total_bytes: int, soft_ratio: float = 0.8, max_features: int = 50,
+                 history_limit: int = 10, min_tree_mib: float = 1.0, tree_shrink: float = 0.75,
+                 check_seconds: float = 300.0):
+        self.total_bytes = total_bytes
+        self.soft_ratio = soft_ratio
+        self.max_features = max_features
+        self.history_limit = history_limit
+        self.min_tree_mib = min_tree_mib
+        self.tree_shrink = tree_shrink
+        self.check_seconds = check_seconds
+        self.last_check: Optional[float] = None
+        self.unreachable_logged = False
+        logger.info("MemoryBudget initialized: %.1f MiB total, policies at %.0f%%, checked every %.0fs",
+                    total_bytes / 2 ** 20, soft_ratio * 100, check_seconds)
+
+    def due(self) -> bool:
+        return self.last_check is None or time.monotonic() - self.last_check >= self.check_seconds
+
+    def report(self, detector, responder=None) -> Dict[str, Any]:
+        components = {f"detector.{k}": v for k, v in detector.memory_usage().items()}
+        if responder is not None:
+            components.update({f"responder.{k}": v for k, v in responder.memory_usage().items()})
+        return {
+            'components': components,
+            'total': sum(components.values()),
+            'budget': self.total_bytes,
+            'rss': current_rss_bytes(),
+        }
+
+    def enforce(self, detector, responder=None) -> Dict[str, Any]:
+        """
+        Measure once, apply policies if over the soft limit, and return the
+        measurement with the list of policies applied under 'applied'.
+        """
+        self.last_check = time.monotonic()
+        report = self.report(detector, responder)
+        applied = []
+        soft_limit = self.soft_ratio * self.total_bytes
+        if report['total'] < soft_limit:
+            report['applied'] = applied
+            return report
+        fixed = sum(v for k, v in report['components'].items()
+                    if k not in self.SHRINKABLE and not k.startswith('responder.'))
+        if fixed >= soft_limit:
+            if not self.unreachable_logged:
+                logger.warning("Memory budget of %.1f MiB cannot be met: components no policy can shrink "
+                               "already use %.1f MiB; raise MEMORY_BUDGET_MB", self.total_bytes / 2 ** 20,
+                               fixed / 2 ** 20)
+                self.unreachable_logged = True
+            report['applied'] = applied
+            return report
+        removed = detector.prune_feature_importance(self.max_features)
+        if removed:
+            applied.append(f"pruned {removed} feature importances")
+        if responder is not None:
+            trimmed = responder.trim_history(self.history_limit)
+            if trimmed:
+                applied.append(f"trimmed {trimmed} history entries")
+        target_mib = detector.tree_size_bytes() * self.tree_shrink / 2 ** 20
+        if target_mib >= self.min_tree_mib and detector.limit_tree_size(target_mib):
+            applied.append(f"capped classifier tree at {target_mib:.1f} MiB")
+        if applied:
+            logger.warning("Memory %.1f MiB over soft limit of %.1f MiB; applied: %s",
+                           report['total'] / 2 ** 20, soft_limit / 2 ** 20, "; ".join(applied))
+        report['applied'] = applied
+        return report
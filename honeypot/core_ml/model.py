@@ -1,6 +1,10 @@
 import logging
 from typing import Any, Dict, List, Tuple
 from river import anomaly, compose, preprocessing, drift, tree, ensemble, metrics
+from river.tree.utils import calculate_object_size
+
+from memory import deep_sizeof
+from logging_setup import PER_EVENT
 
 class AdaptiveAttackDetector:
     """
@@ -90,6 +94,51 @@ class AdaptiveAttackDetector:
     def get_feature_importance(self) -> Dict[str, float]:
         return dict(sorted(self.feature_importance.items(), key=lambda x: -x[1]))
 
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Approximate size in bytes of each model component.
+        """
+        usage = {f"anomaly_detector_{i}": deep_sizeof(d) for i, d in enumerate(self.detectors)}
+        usage['drift_detectors'] = deep_sizeof(self.drift_detectors)
+        usage['classifier'] = deep_sizeof(self.classifier)
+        usage['feature_importance'] = deep_sizeof(self.feature_importance)
+        return usage
+
+    def prune_feature_importance(self, max_features: int) -> int:
+        """
+        Keep only the max_features most important features. Returns the number removed.
+        """
+        excess = len(self.feature_importance) - max_features
+        if excess <= 0:
+            return 0
+        self.feature_importance = dict(sorted(self.feature_importance.items(), key=lambda x: -x[1])[:max_features])
+        return excess
+
+    def tree_size_bytes(self) -> float:
+        """
+        River's own size estimate of the Hoeffding tree (leaf estimates scaled by its
+        overhead fraction), measured directly until the tree has made its first estimate.
+        """
+        hoeffding_tree = list(self.classifier.steps.values())[-1]
+        estimate = hoeffding_tree._size_estimate_overhead_fraction * (
+            hoeffding_tree._n_active_leaves * hoeffding_tree._active_leaf_size_estimate
+            + hoeffding_tree._n_inactive_leaves * hoeffding_tree._inactive_leaf_size_estimate
+        )
+        return estimate if estimate > 0 else calculate_object_size(hoeffding_tree)
+
+    def limit_tree_size(self, max_size_mib: float, memory_estimate_period: int = 1000) -> bool:
+        """
+        Cap the Hoeffding tree size; river deactivates leaves once the estimate exceeds it.
+        Returns True if the limit was lowered.
+        """
+        hoeffding_tree = list(self.classifier.steps.values())[-1]
+        if max_size_mib >= hoeffding_tree.max_size:
+            return False
+        hoeffding_tree.max_size = max_size_mib
+        hoeffding_tree.memory_estimate_period = min(hoeffding_tree.memory_estimate_period, memory_estimate_period)
+        self.logger.info("Classifier tree size limited to %.1f MiB", max_size_mib)
+        return True
+
     def process_log(self, features: Dict[str, Any]) -> Tuple[float, str, Dict[str, float]]:
         """
         Process a single log entry, returning anomaly score, predicted attack type, and feature importances.
@@ -101,7 +150,7 @@ class AdaptiveAttackDetector:
 
             # Compute ensemble anomaly score
             anomaly_score = self._ensemble_anomaly_score(features)
-            self.logger.info("Ensemble anomaly score: %.2f", anomaly_score)
+            self.logger.info("Ensemble anomaly score: %.2f", anomaly_score, extra=PER_EVENT)
 
             # Update all detectors
             for i, detector in enumerate(self.detectors):
@@ -123,7 +172,7 @@ class AdaptiveAttackDetector:
                 attack_type = self.classifier.predict_one(features)
                 if attack_type is None or (isinstance(attack_type, str) and attack_type.lower() == "normal"):
                     attack_type = "generic_attack"
-                self.logger.info("Attack detected: type %s, score %.2f", attack_type, anomaly_score)
+                self.logger.info("Attack detected: type %s, score %.2f", attack_type, anomaly_score, extra=PER_EVENT)
             except Exception as e:
                 self.logger.error("Classifier prediction failed with features %s: %s", features, e)
                 attack_type = "generic_attack"
@@ -0,0 +1,200 @@
+import logging
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Profiles copied per lock acquisition, and encoded per write, while snapshotting
+SNAPSHOT_CHUNK = 2000
+
+
+class ThreatProfileStore:
+    """
+    Bounded in-process per-IP threat profiles, updated incrementally by the main
+    loop and evicted least-recently-seen first. Lookups are a single dict access
+    under a lock, so the control API can serve them while the loop runs.
+    With snapshot_seconds > 0, snapshots are written by a background thread.
+    """
+    def __init__(self, max_profiles: int = 100000, snapshot_path: Optional[str] = "threat_profiles.json",
+                 snapshot_seconds: float = 0):
+        self.max_profiles = max_profiles
+        self.snapshot_path = snapshot_path
+        self.profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.evictions = 0
+        self.dirty = False
+        self.stop_event = threading.Event()
+        self.snapshot_thread = None
+        if snapshot_path:
+            self.load()
+            if snapshot_seconds > 0:
+                self.snapshot_thread = threading.Thread(target=self._snapshot_loop, args=(snapshot_seconds,),
+                                                        name="profile-snapshots", daemon=True)
+                self.snapshot_thread.start()
+
+    def update(self, ip: str, timestamp: datetime, score: Optional[float] = None, attack_type: Optional[str] = None,
+               actions: Optional[Iterable[str]] = None, location: Optional[str] = None,
+               block: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Fold one event into the IP's profile.
+        score/attack_type/actions are only given for events that went through scoring;
+        block is the blocklist entry covering the IP, if any.
+        """
+        seen = timestamp.isoformat()
+        with self.lock:
+            # Set under the lock so a snapshot that clears it also sees this update
+            self.dirty = True
+            profile = self.profiles.get(ip)
+            if profile is None:
+                profile = self.profiles[ip] = {
+                    'ip': ip,
+                    'first_seen': seen,
+                    'last_seen': seen,
+                    'attempts': 0,
+                    'scored': 0,
+                    'last_score': None,
+                    'max_score': None,
+                    'attack_types': {},
+                    'actions': {},
+                    'location': None,
+                    'block': None,
+                }
+                while len(self.profiles) > self.max_profiles:
+                    self.profiles.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self.profiles.move_to_end(ip)
+            profile['attempts'] += 1
+            if seen > profile['last_seen']:
+                profile['last_seen'] = seen
+            if seen < profile['first_seen']:
+                profile['first_seen'] = seen
+            if attack_type:
+                profile['attack_types'][attack_type] = profile['attack_types'].get(attack_type, 0) + 1
+            if score is not None:
+                profile['scored'] += 1
+                profile['last_score'] = score
+                profile['max_score'] = score if profile['max_score'] is None else max(profile['max_score'], score)
+            for action in actions or []:
+                profile['actions'][action] = profile['actions'].get(action, 0) + 1
+            if location and location != "Unknown":
+                profile['location'] = location
+            if block is not None:
+                profile['block'] = {'target': block['target'], 'expires': block['expires']}
+
+    def get(self, ip: str) -> Optional[Dict[str, Any]]:
+        """
+        A copy of the IP's profile; 'blocked' reflects whether its block is still active.
+        """
+        with self.lock:
+            profile = self.profiles.get(ip)
+            if profile is None:
+                return None
+            profile = dict(profile, attack_types=dict(profile['attack_types']), actions=dict(profile['actions']))
+        block = profile.get('block')
+        profile['blocked'] = block is not None and (block['expires'] is None or block['expires'] > time.time())
+        profile['blocked_until'] = (datetime.fromtimestamp(block['expires']).isoformat()
+                                    if profile['blocked'] and block['expires'] is not None else None)
+        return profile
+
+    def bulk(self, ips: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        return {ip: self.get(ip) for ip in ips}
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def register_routes(self, control) -> None:
+        control.add_route('GET', '/ip', self._route_ip)
+        control.add_route('GET', '/ips', self._route_bulk)
+        control.add_route('POST', '/ips', self._route_bulk)
+
+    def _route_ip(self, path: str, query: Dict[str, List[str]], body: Any) -> Tuple[int, Any]:
+        ip = path[len('/ip/'):] if path.startswith('/ip/') else ''
+        if not ip:
+            return 400, {'error': 'usage: GET /ip/<address>'}
+        profile = self.get(ip)
+        if profile is None:
+            return 404, {'ip': ip, 'error': 'no profile'}
+        return 200, profile
+
+    def _route_bulk(self, path: str, query: Dict[str, List[str]], body: Any) -> Tuple[int, Any]:
+        ips = list(query.get('ip', []))
+        if isinstance(body, dict):
+            ips.extend(body.get('ips', []))
+        elif isinstance(body, list):
+            ips.extend(body)
+        if not ips:
+            return 400, {'error': 'pass ?ip=...&ip=... or a JSON body {"ips": [...]}'}
+        return 200, self.bulk(str(ip) for ip in ips)
+
+    def load(self) -> None:
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.info("No threat profile snapshot at %s, starting empty.", self.snapshot_path)
+            return
+        except Exception as e:
+            logger.error("Failed to load threat profiles from %s: %s", self.snapshot_path, e)
+            return
+        profiles = sorted(data.get('profiles', []), key=lambda p: p.get('last_seen', ''))
+        with self.lock:
+            for profile in profiles[-self.max_profiles:]:
+                profile.pop('blocked', None)  # derived from 'block' in get()
+                profile.setdefault('block', None)
+                self.profiles[profile['ip']] = profile
+        logger.info("Loaded %d threat profiles from %s", len(self.profiles), self.snapshot_path)
+
+    def _snapshot_loop(self, interval: float) -> None:
+        while not self.stop_event.wait(interval):
+            self.snapshot()
+
+    def snapshot(self) -> None:
+        """
+        Copy the profiles and write them to snapshot_path. The copy takes the lock
+        in chunks so concurrent updates are only held up briefly. Skipped when
+        nothing changed since the last snapshot.
+        """
+        if not self.snapshot_path or not self.dirty:
+            return
+        with self.write_lock:
+            with self.lock:
+                self.dirty = False
+                ips = list(self.profiles)
+            profiles = []
+            for start in range(0, len(ips), SNAPSHOT_CHUNK):
+                with self.lock:
+                    for ip in ips[start:start + SNAPSHOT_CHUNK]:
+                        p = self.profiles.get(ip)
+                        if p is not None:
+                            profiles.append(dict(p, attack_types=dict(p['attack_types']), actions=dict(p['actions'])))
+            tmp_path = f"{self.snapshot_path}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    # Encoded chunk by chunk: one json.dump of the whole list holds the GIL for its full duration
+                    f.write('{"saved": %s, "profiles": [' % json.dumps(datetime.now().isoformat()))
+                    for start in range(0, len(profiles), SNAPSHOT_CHUNK):
+                        if start:
+                            f.write(', ')
+                        f.write(json.dumps(profiles[start:start + SNAPSHOT_CHUNK])[1:-1])
+                    f.write(']}')
+                os.replace(tmp_path, self.snapshot_path)
+                logger.info("Threat profiles snapshot saved to %s (%d profiles)", self.snapshot_path, len(profiles))
+            except Exception as e:
+                self.dirty = True
+                logger.error("Failed to save threat profiles: %s", e)
+
+    def close(self) -> None:
+        """
+        Stop background snapshots and write a final one.
+        """
+        self.stop_event.set()
+        if self.snapshot_thread is not None:
+            self.snapshot_thread.join()
+        self.snapshot()
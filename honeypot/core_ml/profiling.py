@@ -0,0 +1,208 @@
+import logging
+import cProfile
+import io
+import math
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CORE_ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ProfilingHooks:
+    """
+    On-demand profiling of the running detector. Nothing is installed in the hot
+    path: captures are started by a signal or the control endpoint and write
+    timestamped files to output_dir.
+
+    - SIGUSR1: timed cProfile capture of the main thread plus a stage sample
+    - SIGUSR2: tracemalloc snapshot diff over a time window
+    """
+    def __init__(self, output_dir: str = "profiles", default_seconds: float = 30.0,
+                 sample_interval: float = 0.01, top_n: int = 25):
+        self.output_dir = output_dir
+        self.default_seconds = default_seconds
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.main_thread_id = threading.main_thread().ident
+        # Re-entrant: signal handlers run on the main thread and may interrupt it inside the lock
+        self.lock = threading.RLock()
+        self.cpu_profiler: Optional[cProfile.Profile] = None
+        self.cpu_deadline = 0.0
+        self.cpu_seconds = default_seconds
+        self.memory_active = False
+        self.stages_active = False
+
+    def install_signal_handlers(self) -> bool:
+        if not hasattr(signal, 'SIGUSR1'):
+            logger.warning("Profiling signals are not available on this platform; use the control endpoint.")
+            return False
+        signal.signal(signal.SIGUSR1, self._on_cpu_signal)
+        signal.signal(signal.SIGUSR2, lambda signum, frame: self.start_memory_diff())
+        logger.info("Profiling hooks installed: SIGUSR1 for CPU/stage capture, SIGUSR2 for memory diff (pid %d)",
+                    os.getpid())
+        return True
+
+    def register_routes(self, control) -> None:
+        control.add_route('POST', '/profile/cpu', self._route(self.request_cpu_profile))
+        control.add_route('POST', '/profile/memory', self._route(self.start_memory_diff))
+        control.add_route('POST', '/profile/stages', self._route(self.start_stage_sampling))
+
+    def _route(self, start):
+        def handler(path: str, query: Dict[str, List[str]], body: Any) -> Tuple[int, Any]:
+            try:
+                seconds = float(query.get('seconds', [self.default_seconds])[0])
+            except ValueError:
+                seconds = None
+            if seconds is None or not math.isfinite(seconds) or seconds <= 0:
+                return 400, {'started': False, 'error': 'seconds must be a positive number'}
+            started = start(seconds)
+            if not started:
+                return 409, {'started': False, 'reason': 'capture already running or unavailable'}
+            return 202, {'started': True, 'seconds': seconds, 'output_dir': os.path.abspath(self.output_dir)}
+        return handler
+
+    def _path(self, kind: str, ext: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, f"{kind}-{datetime.now():%Y%m%d-%H%M%S}.{ext}")
+
+    # CPU profile. cProfile only sees the thread that enables it, so start and
+    # stop always run in the main thread through the SIGUSR1 handler.
+
+    def request_cpu_profile(self, seconds: Optional[float] = None) -> bool:
+        if not hasattr(signal, 'SIGUSR1'):
+            logger.warning("CPU profile capture needs SIGUSR1, which this platform does not provide.")
+            return False
+        with self.lock:
+            if self.cpu_profiler is not None:
+                return False
+            self.cpu_seconds = seconds or self.default_seconds
+        if threading.get_ident() == self.main_thread_id:
+            self._on_cpu_signal(None, None)
+            return True
+        signal.pthread_kill(self.main_thread_id, signal.SIGUSR1)
+        return True
+
+    def _on_cpu_signal(self, signum, frame) -> None:
+        with self.lock:
+            profiler = self.cpu_profiler
+            if profiler is None:
+                seconds = self.cpu_seconds
+                self.cpu_seconds = self.default_seconds
+                self.cpu_profiler = cProfile.Profile()
+                self.cpu_deadline = time.monotonic() + seconds
+                self.cpu_profiler.enable()
+            elif time.monotonic() >= self.cpu_deadline:
+                profiler.disable()
+                self.cpu_profiler = None
+            else:
+                return
+        if profiler is None:
+            logger.info("CPU profile capture started for %.0fs", seconds)
+            self.start_stage_sampling(seconds)
+            threading.Timer(seconds, signal.pthread_kill, (self.main_thread_id, signal.SIGUSR1)).start()
+            return
+        self._write_cpu_profile(profiler)
+
+    def _write_cpu_profile(self, profiler: cProfile.Profile) -> None:
+        try:
+            prof_path = self._path('cpu', 'prof')
+            profiler.dump_stats(prof_path)
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(self.top_n * 2)
+            with open(prof_path[:-len('prof')] + 'txt', 'w') as f:
+                f.write(text.getvalue())
+            logger.info("CPU profile written to %s", prof_path)
+        except Exception as e:
+            logger.error("Failed to write CPU profile: %s", e)
+
+    # Memory diff runs entirely on a background thread.
+
+    def start_memory_diff(self, seconds: Optional[float] = None) -> bool:
+        with self.lock:
+            if self.memory_active:
+                return False
+            self.memory_active = True
+        threading.Thread(target=self._memory_diff, args=(seconds or self.default_seconds,),
+                         name="profile-memory", daemon=True).start()
+        return True
+
+    def _memory_diff(self, seconds: float) -> None:
+        started_here = not tracemalloc.is_tracing()
+        try:
+            if started_here:
+                tracemalloc.start(10)
+            logger.info("tracemalloc capture started for %.0fs", seconds)
+            before = tracemalloc.take_snapshot()
+            time.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+            diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+            current, peak = tracemalloc.get_traced_memory()
+            path = self._path('memory', 'txt')
+            with open(path, 'w') as f:
+                f.write(f"tracemalloc diff over {seconds:.0f}s; traced current={current} peak={peak} bytes\n")
+                f.write(f"Top {self.top_n} allocation sites by growth:\n")
+                for stat in diff[:self.top_n]:
+                    f.write(f"{stat}\n")
+            logger.info("Memory diff written to %s", path)
+        except Exception as e:
+            logger.error("tracemalloc capture failed: %s", e)
+        finally:
+            if started_here:
+                tracemalloc.stop()
+            with self.lock:
+                self.memory_active = False
+
+    # Stage sampling reads the main thread's stack from a background thread, so
+    # the detection loop itself is not instrumented.
+
+    def start_stage_sampling(self, seconds: Optional[float] = None) -> bool:
+        with self.lock:
+            if self.stages_active:
+                return False
+            self.stages_active = True
+        threading.Thread(target=self._sample_stages, args=(seconds or self.default_seconds,),
+                         name="profile-stages", daemon=True).start()
+        return True
+
+    def _current_stage(self) -> str:
+        frame = sys._current_frames().get(self.main_thread_id)
+        stages = []
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if os.path.dirname(os.path.abspath(filename)) == CORE_ML_DIR:
+                module = os.path.splitext(os.path.basename(filename))[0]
+                if module != 'profiling':
+                    stages.append(f"{module}.{frame.f_code.co_name}")
+            frame = frame.f_back
+        return " > ".join(reversed(stages)) if stages else "<outside core_ml>"
+
+    def _sample_stages(self, seconds: float) -> None:
+        try:
+            counts: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                counts[self._current_stage()] += 1
+                time.sleep(self.sample_interval)
+            total = sum(counts.values()) or 1
+            path = self._path('stages', 'txt')
+            with open(path, 'w') as f:
+                f.write(f"{total} samples over {seconds:.0f}s every {self.sample_interval * 1000:.0f}ms\n")
+                for stage, count in counts.most_common():
+                    f.write(f"{100.0 * count / total:6.2f}%  {count:7d}  {stage}\n")
+            logger.info("Stage samples written to %s", path)
+        except Exception as e:
+            logger.error("Stage sampling failed: %s", e)
+        finally:
+            with self.lock:
+                self.stages_active = False
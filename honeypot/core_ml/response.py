@@ -1,18 +1,23 @@
 import logging
 from datetime import datetime
 import numpy as np
-from collections import defaultdict
+from collections import defaultdict, deque
+from functools import partial
 import csv
 import os
 from typing import Optional, Dict, Any, List
 
+from memory import deep_sizeof
+from logging_setup import PER_EVENT
+
 logger = logging.getLogger(__name__)
 
 class ResponseEngine:
     """
     Decides and logs responses to detected attacks, with adaptive thresholds and strategies.
     """
-    def __init__(self, initial_thresholds: Optional[Dict[str, float]] = None, learning_rate: float = 0.1):
+    def __init__(self, initial_thresholds: Optional[Dict[str, float]] = None, learning_rate: float = 0.1,
+                 history_limit: int = 10):
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         default_thresholds = {'brute_force': 0.7, 'command_injection': 0.9, 'suspicious': 0.5}
@@ -41,7 +46,9 @@ class ResponseEngine:
             }
         }
         self.learning_rate = learning_rate
-        self.feedback_memory = defaultdict(list)
+        # Ring buffers so history does not grow over long runs
+        self.history_limit = max(history_limit, 5)  # _adjust_threshold needs the last 5 outcomes
+        self.feedback_memory = defaultdict(partial(deque, maxlen=self.history_limit))
         self.logger.info("ResponseEngine initialized successfully")
 
     def determine_response(self, attack_type: str, confidence: float, context: Optional[Dict[str, Any]] = None) -> List[str]:
@@ -53,14 +60,14 @@ class ResponseEngine:
                 self.logger.warning("Unknown attack type: %s", attack_type)
                 return ['alert']
             strategy = self.strategies[attack_type]
-            self.logger.info("Determining response for %s with confidence %.2f", attack_type, confidence)
+            self.logger.info("Determining response for %s with confidence %.2f", attack_type, confidence, extra=PER_EVENT)
             effective_threshold = self._adjust_threshold(attack_type, confidence)
             if confidence > effective_threshold:
                 actions = strategy['learned_response'] or strategy['actions']
-                self.logger.info("Using response for %s: %s", attack_type, actions)
+                self.logger.info("Using response for %s: %s", attack_type, actions, extra=PER_EVENT)
             else:
                 actions = ['alert']
-                self.logger.info("Low confidence, issuing alert for %s", attack_type)
+                self.logger.info("Low confidence, issuing alert for %s", attack_type, extra=PER_EVENT)
             self._log_response(attack_type, confidence, actions, context)
             return actions
         except Exception as e:
@@ -82,7 +89,7 @@ class ResponseEngine:
             adjusted_threshold = strategy['threshold']
         strategy['threshold'] = adjusted_threshold
         strategy['last_updated'] = datetime.now()
-        self.logger.info("Adjusted threshold for %s to %.2f", attack_type, adjusted_threshold)
+        self.logger.info("Adjusted threshold for %s to %.2f", attack_type, adjusted_threshold, extra=PER_EVENT)
         return adjusted_threshold
 
     def update_strategy(self, attack_type: str, success_rate: float, feedback: Optional[Dict[str, Any]] = None) -> None:
@@ -93,11 +100,11 @@ class ResponseEngine:
             strategy = self.strategies[attack_type]
             strategy['success_history'].append(success_rate)
             self.feedback_memory[attack_type].append(feedback or {})
-            self.logger.info("Updating strategy for %s with success rate %.2f", attack_type, success_rate)
+            self.logger.info("Updating strategy for %s with success rate %.2f", attack_type, success_rate, extra=PER_EVENT)
             if success_rate < 0.5:
                 self._evolve_strategy(attack_type, success_rate)
-            elif len(strategy['success_history']) > 10:
-                strategy['success_history'] = strategy['success_history'][-10:]
+            if len(strategy['success_history']) > self.history_limit:
+                strategy['success_history'] = strategy['success_history'][-self.history_limit:]
             strategy['last_updated'] = datetime.now()
         except Exception as e:
             self.logger.error("Error updating strategy: %s", e)
@@ -116,6 +123,36 @@ class ResponseEngine:
             self.logger.info("Added alert to suspicious strategy", attack_type)
         strategy['learned_response'] = strategy['actions'].copy()
 
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Approximate size in bytes of the engine's state.
+        """
+        return {
+            'strategies': deep_sizeof(self.strategies),
+            'feedback_memory': deep_sizeof(self.feedback_memory),
+        }
+
+    def trim_history(self, limit: int) -> int:
+        """
+        Shrink success and feedback history to at most limit entries per attack type.
+        Returns the number of entries dropped.
+        """
+        dropped = 0
+        limit = max(limit, 5)  # _adjust_threshold needs the last 5 outcomes
+        if limit < self.history_limit:
+            self.history_limit = limit
+        for strategy in self.strategies.values():
+            excess = len(strategy['success_history']) - self.history_limit
+            if excess > 0:
+                strategy['success_history'] = strategy['success_history'][-self.history_limit:]
+                dropped += excess
+        for attack_type, history in list(self.feedback_memory.items()):
+            if history.maxlen != self.history_limit:
+                dropped += max(0, len(history) - self.history_limit)
+                self.feedback_memory[attack_type] = deque(history, maxlen=self.history_limit)
+        self.feedback_memory.default_factory = partial(deque, maxlen=self.history_limit)
+        return dropped
+
     def _log_response(self, attack_type: str, confidence: float, actions: List[str], context: Optional[Dict[str, Any]]) -> None:
         log_entry = {
             'timestamp': datetime.now(),
@@ -124,30 +161,44 @@ class ResponseEngine:
             'actions': actions,
             'context': context or {}
         }
-        self.logger.info("Response logged: %s", log_entry)
+        self.logger.info("Response logged: %s", log_entry, extra=PER_EVENT)
         # Only log to CSV if actions != ['alert']
         if actions != ['alert']:
             ip = context.get("ip", "Unknown") if context else "Unknown"
             location = context.get("location", "Unknown") if context else "Unknown"
             top_features = context.get("top_features", []) if context else []
-            timestamp_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             protection_instructions = {
                 'brute_force': "Temporarily block the IP and require captcha verification to mitigate rapid brute force attempts.",
                 'command_injection': "Permanently block the IP and initiate deep network inspection to prevent command injection and potential malware.",
                 'suspicious': "Monitor the IP activity closely and analyze further to determine if additional actions are necessary."
             }
             recommended_steps = protection_instructions.get(attack_type, ", ".join(actions))
-            csv_filename = "malicious_attempts.csv"
-            file_exists = os.path.isfile(csv_filename)
-            try:
-                with open(csv_filename, "a", newline="") as csvfile:
-                    writer = csv.writer(csvfile)
-                    if not file_exists:
-                        writer.writerow(["IP", "Time", "Attack Type", "Location", "Top Features", "Recommended Steps"])
-                    writer.writerow([ip, timestamp_str, attack_type, location, str(top_features), recommended_steps])
-                self.logger.info("Malicious attempt logged to CSV with recommended steps and top features.")
-            except Exception as csv_err:
-                self.logger.error("Error writing to CSV: %s", csv_err)
+            if self._write_csv_row(ip, attack_type, location, top_features, recommended_steps):
+                self.logger.info("Malicious attempt logged to CSV with recommended steps and top features.", extra=PER_EVENT)
+
+    def log_blocked(self, ip: str, block_entry: Dict[str, Any]) -> None:
+        """
+        Record an event from an already-blocked IP without re-running response selection.
+        """
+        expires = block_entry.get('expires')
+        status = "permanent block" if expires is None else f"temporary block until {datetime.fromtimestamp(expires):%Y-%m-%d %H:%M:%S}"
+        self._write_csv_row(ip, block_entry.get('attack_type') or 'blocked', block_entry.get('location') or 'Unknown',
+                            [], f"Already blocked ({status} on {block_entry.get('target', ip)}); no action needed.")
+
+    def _write_csv_row(self, ip: str, attack_type: str, location: str, top_features: List[Any], recommended_steps: str) -> bool:
+        timestamp_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        csv_filename = "malicious_attempts.csv"
+        file_exists = os.path.isfile(csv_filename)
+        try:
+            with open(csv_filename, "a", newline="") as csvfile:
+                writer = csv.writer(csvfile)
+                if not file_exists:
+                    writer.writerow(["IP", "Time", "Attack Type", "Location", "Top Features", "Recommended Steps"])
+                writer.writerow([ip, timestamp_str, attack_type, location, str(top_features), recommended_steps])
+            return True
+        except Exception as csv_err:
+            self.logger.error("Error writing to CSV: %s", csv_err)
+            return False
 
 
 
@@ -0,0 +1,296 @@
+import logging
+import hashlib
+import math
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _hash64(key: str) -> int:
+    # Stable across processes, unlike the salted built-in hash()
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8', 'replace'), digest_size=8).digest(), 'little')
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch for approximate per-key counts in fixed memory.
+    Estimates never undercount; overcount is bounded by total / width with high probability.
+    """
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.tables = [array('q', [0]) * width for _ in range(depth)]
+        self.total = 0
+
+    def _indexes(self, key: str) -> List[int]:
+        # Kirsch-Mitzenmacher double hashing: one 64-bit hash gives all rows
+        h = _hash64(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> None:
+        for row, idx in zip(self.tables, self._indexes(key)):
+            row[idx] += count
+        self.total += count
+
+    def estimate(self, key: str) -> int:
+        return min(row[idx] for row, idx in zip(self.tables, self._indexes(key)))
+
+    def estimate_many(self, key: str, sketches: List['CountMinSketch']) -> int:
+        """
+        Estimate the summed count of key across several sketches of identical shape,
+        hashing the key only once.
+        """
+        idxs = self._indexes(key)
+        return min(sum(s.tables[r][idx] for s in sketches) for r, idx in enumerate(idxs))
+
+    def clear(self) -> None:
+        for row in self.tables:
+            row[:] = array('q', [0]) * self.width
+        self.total = 0
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter. Precision p uses 2**p one-byte registers.
+    """
+    def __init__(self, precision: int = 10):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        if self.m >= 128:
+            self.alpha = 0.7213 / (1 + 1.079 / self.m)
+        else:
+            self.alpha = {16: 0.673, 32: 0.697, 64: 0.709}[self.m]
+
+    def add(self, key: str) -> Tuple[int, int, int]:
+        """
+        Add a key. Returns (register index, old value, new value) so callers can
+        maintain derived registers incrementally.
+        """
+        h = _hash64(key)
+        idx = h & (self.m - 1)
+        w = h >> self.precision
+        rho = (64 - self.precision) - w.bit_length() + 1
+        old = self.registers[idx]
+        if rho > old:
+            self.registers[idx] = rho
+            return idx, old, rho
+        return idx, old, old
+
+    def count(self) -> float:
+        return _hll_estimate(self.alpha, self.m, sum(2.0 ** -r for r in self.registers),
+                             self.registers.count(0))
+
+    def clear(self) -> None:
+        self.registers = bytearray(self.m)
+
+
+def _hll_estimate(alpha: float, m: int, inverse_sum: float, zeros: int) -> float:
+    estimate = alpha * m * m / inverse_sum
+    if estimate <= 2.5 * m and zeros > 0:
+        # Small-range correction (linear counting)
+        return m * math.log(m / zeros)
+    return estimate
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-k heavy hitter tracker with at most k counters.
+    """
+    def __init__(self, k: int = 20):
+        self.k = k
+        self.counts: Dict[str, float] = {}
+        self.errors: Dict[str, float] = {}
+        self.total = 0.0
+
+    def add(self, key: str, count: float = 1) -> None:
+        self.total += count
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.k:
+            self.counts[key] = count
+            self.errors[key] = 0
+        else:
+            victim = min(self.counts, key=self.counts.__getitem__)
+            floor = self.counts.pop(victim)
+            self.errors.pop(victim, None)
+            self.counts[key] = floor + count
+            self.errors[key] = floor
+
+    def decay(self, factor: float = 0.5) -> None:
+        for key in self.counts:
+            self.counts[key] *= factor
+            self.errors[key] *= factor
+        self.total *= factor
+
+    def guaranteed(self, key: str) -> float:
+        """
+        Lower bound on the key's count: its counter minus the overestimate it inherited.
+        """
+        if key not in self.counts:
+            return 0.0
+        return self.counts[key] - self.errors[key]
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, float]]:
+        ranked = sorted(self.counts.items(), key=lambda x: -x[1])
+        return ranked[:n] if n else ranked
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.counts
+
+
+class _WindowBucket:
+    __slots__ = ('epoch', 'attempts', 'ips', 'users')
+
+    def __init__(self, cms_width: int, cms_depth: int, hll_precision: int):
+        self.epoch = None
+        self.attempts = CountMinSketch(cms_width, cms_depth)
+        self.ips = HyperLogLog(hll_precision)
+        self.users = HyperLogLog(hll_precision)
+
+    def reset(self, epoch: Optional[int]) -> None:
+        self.epoch = epoch
+        self.attempts.clear()
+        self.ips.clear()
+        self.users.clear()
+
+
+class _WindowRegisters:
+    """
+    Union of the HLL registers of all live buckets, with the estimator sum
+    maintained incrementally so a distinct-count query is O(1).
+    """
+    def __init__(self, precision: int):
+        self.hll = HyperLogLog(precision)
+        self.inverse_sum = float(self.hll.m)
+        self.zeros = self.hll.m
+
+    def raise_register(self, idx: int, value: int) -> None:
+        old = self.hll.registers[idx]
+        if value > old:
+            self.hll.registers[idx] = value
+            self.inverse_sum += 2.0 ** -value - 2.0 ** -old
+            if old == 0:
+                self.zeros -= 1
+
+    def rebuild(self, sources: List[HyperLogLog]) -> None:
+        regs = self.hll.registers
+        for i in range(self.hll.m):
+            regs[i] = max((s.registers[i] for s in sources), default=0)
+        self.inverse_sum = sum(2.0 ** -r for r in regs)
+        self.zeros = regs.count(0)
+
+    def count(self) -> float:
+        return _hll_estimate(self.hll.alpha, self.hll.m, self.inverse_sum, self.zeros)
+
+
+class StreamAggregator:
+    """
+    Sliding-window aggregation of attack traffic using fixed-size sketches.
+    The window is split into buckets; each bucket holds a Count-Min sketch of
+    per-IP attempts and HyperLogLogs of distinct IPs and usernames. Memory is
+    independent of the number of source IPs. An IP is a heavy hitter when its
+    guaranteed Space-Saving count is at least heavy_hitter_fraction of the
+    (equally decayed) total.
+    """
+    def __init__(self, window_seconds: int = 60, buckets: int = 6, cms_width: int = 2048,
+                 cms_depth: int = 4, hll_precision: int = 10, top_k: int = 20,
+                 heavy_hitter_fraction: float = 0.1):
+        if window_seconds <= 0 or buckets <= 0:
+            raise ValueError("window_seconds and buckets must be positive")
+        self.window_seconds = window_seconds
+        self.bucket_seconds = window_seconds / buckets
+        self.buckets = [_WindowBucket(cms_width, cms_depth, hll_precision) for _ in range(buckets)]
+        self.window_ips = _WindowRegisters(hll_precision)
+        self.window_users = _WindowRegisters(hll_precision)
+        self.heavy_hitters = SpaceSaving(top_k)
+        self.heavy_hitter_fraction = heavy_hitter_fraction
+        self.current_epoch = None
+        logger.info("StreamAggregator initialized: %ss window, %d buckets, CMS %dx%d, HLL p=%d, top-%d",
+                    window_seconds, buckets, cms_depth, cms_width, hll_precision, top_k)
+
+    def _oldest_epoch(self) -> int:
+        return self.current_epoch - len(self.buckets) + 1
+
+    def _live_buckets(self) -> List[_WindowBucket]:
+        oldest = self._oldest_epoch()
+        return [b for b in self.buckets if b.epoch is not None and b.epoch >= oldest]
+
+    def _expire(self) -> None:
+        """
+        Clear every bucket that fell out of the window and rebuild the window registers
+        from the remaining ones, whichever slots the next events land in.
+        """
+        oldest = self._oldest_epoch()
+        expired = [b for b in self.buckets if b.epoch is not None and b.epoch < oldest]
+        if not expired:
+            return
+        for b in expired:
+            b.reset(None)
+        live = self._live_buckets()
+        self.window_ips.rebuild([b.ips for b in live])
+        self.window_users.rebuild([b.users for b in live])
+        self.heavy_hitters.decay(0.5 ** len(expired))
+
+    def _advance(self, epoch: int) -> Optional[_WindowBucket]:
+        if self.current_epoch is None or epoch > self.current_epoch:
+            self.current_epoch = epoch
+            self._expire()
+        elif epoch < self._oldest_epoch():
+            # Event older than the window: account it to nothing
+            return None
+        bucket = self.buckets[epoch % len(self.buckets)]
+        if bucket.epoch != epoch:
+            bucket.reset(epoch)
+        return bucket
+
+    def observe(self, ip: str, timestamp: float, username: Optional[str] = None, attempts: int = 1) -> None:
+        """
+        Record one log entry. timestamp is seconds since the epoch of the event.
+        """
+        bucket = self._advance(int(timestamp // self.bucket_seconds))
+        if bucket is None:
+            return
+        attempts = max(int(attempts), 1)
+        bucket.attempts.add(ip, attempts)
+        idx, _, value = bucket.ips.add(ip)
+        self.window_ips.raise_register(idx, value)
+        if username:
+            idx, _, value = bucket.users.add(username)
+            self.window_users.raise_register(idx, value)
+        self.heavy_hitters.add(ip, attempts)
+
+    def attempts(self, ip: str) -> int:
+        if self.current_epoch is None:
+            return 0
+        live = [b.attempts for b in self._live_buckets()]
+        if not live:
+            return 0
+        return live[0].estimate_many(ip, live)
+
+    def distinct_ips(self) -> float:
+        return self.window_ips.count()
+
+    def distinct_usernames(self) -> float:
+        return self.window_users.count()
+
+    def is_heavy_hitter(self, ip: str) -> bool:
+        total = self.heavy_hitters.total
+        return total > 0 and self.heavy_hitters.guaranteed(ip) >= self.heavy_hitter_fraction * total
+
+    def features(self, ip: str) -> Dict[str, float]:
+        """
+        Windowed rate features for the given IP.
+        """
+        window_attempts = self.attempts(ip)
+        return {
+            'ip_window_attempts': window_attempts,
+            'ip_attempt_rate': window_attempts / self.window_seconds,
+            'distinct_ips_window': self.distinct_ips(),
+            'distinct_usernames_window': self.distinct_usernames(),
+            'ip_heavy_hitter': int(self.is_heavy_hitter(ip)),
+        }
@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from admission import AdmissionController
+
+LOW_RISK = {"auth_attempts": {"failed": 5, "success": 0}, "commands": []}
+
+
+class TestAdmissionController(unittest.TestCase):
+    def overloaded(self):
+        controller = AdmissionController(high_watermark=100, low_watermark=10, min_keep_ratio=0.1,
+                                         decrease=0.5, increase=0.25, adjust_interval=0)
+        controller.observe_load(500, 0.0)
+        return controller
+
+    def test_admits_everything_when_not_overloaded(self):
+        controller = AdmissionController(adjust_interval=0)
+        controller.observe_load(0, 0.0)
+        self.assertTrue(all(controller.admit(LOW_RISK, False) for _ in range(100)))
+
+    def test_sheds_low_risk_events_at_keep_ratio(self):
+        controller = self.overloaded()
+        self.assertTrue(controller.shedding)
+        self.assertEqual(controller.keep_ratio, 0.5)
+        admitted = sum(controller.admit(LOW_RISK, False) for _ in range(100))
+        self.assertEqual(admitted, 50)
+        self.assertEqual(controller.stats()['shed'], 50)
+
+    def test_never_sheds_new_ips_commands_or_successful_logins(self):
+        controller = self.overloaded()
+        for _ in range(20):
+            self.assertTrue(controller.admit(LOW_RISK, True))
+            self.assertTrue(controller.admit(dict(LOW_RISK, commands=["uname -a"]), False))
+            self.assertTrue(controller.admit({"auth_attempts": {"failed": 0, "success": 1}}, False))
+
+    def test_recovers_additively_once_caught_up(self):
+        controller = self.overloaded()
+        controller.observe_load(500, 0.0)
+        self.assertEqual(controller.keep_ratio, 0.25)
+        controller.observe_load(0, 0.0)
+        self.assertTrue(controller.shedding)
+        for _ in range(3):
+            controller.observe_load(0, 0.0)
+        self.assertEqual(controller.keep_ratio, 1.0)
+        self.assertFalse(controller.shedding)
+
+    def test_lag_alone_triggers_shedding(self):
+        controller = AdmissionController(max_lag_seconds=5, adjust_interval=0)
+        controller.observe_load(0, 10.0)
+        self.assertTrue(controller.shedding)
+
+
+if __name__ == "__main__":
+    unittest.main()
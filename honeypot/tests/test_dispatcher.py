@@ -0,0 +1,110 @@
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from dispatcher import ActionDispatcher, Destination, HTTPConnectionPool, TokenBucket
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.received.append(json.loads(body))
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _IdleClosingHandler(_StubHandler):
+    # Keep-alive connections are dropped after 0.2s idle, like a webhook server's keep-alive timeout
+    timeout = 0.2
+
+
+class TestActionDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.server.received = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_alert_then_digest(self):
+        dispatcher = ActionDispatcher([Destination('webhook', 'webhook', self.url, rate=0)],
+                                      digest_seconds=60, flush_interval=0.05)
+        for score in (0.5, 0.9, 0.7):
+            self.assertTrue(dispatcher.submit("192.0.2.7", "brute_force", ["alert", "temp_block"], score,
+                                              {"location": "Nowhere"}))
+        dispatcher.close()
+        received = self.server.received
+        self.assertEqual([p['type'] for p in received], ['alert', 'digest'])
+        self.assertEqual(received[0]['count'], 1)
+        self.assertEqual(received[1]['count'], 2)
+        self.assertEqual(received[1]['max_score'], 0.9)
+        self.assertEqual(received[1]['actions'], ["alert", "temp_block"])
+        self.assertEqual(dispatcher.stats()['destinations']['webhook']['sent'], 2)
+
+    def test_block_only_destination_skips_alerts(self):
+        dispatcher = ActionDispatcher([Destination('blocks', 'webhook', self.url, rate=0, only_blocks=True)],
+                                      flush_interval=0.05)
+        dispatcher.submit("192.0.2.8", "suspicious", ["alert"], 0.3)
+        dispatcher.submit("192.0.2.9", "command_injection", ["perm_block"], 0.9)
+        dispatcher.close()
+        self.assertEqual([p['ip'] for p in self.server.received], ["192.0.2.9"])
+
+
+class TestIdleConnections(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _IdleClosingHandler)
+        self.server.received = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_pool_reconnects_after_server_closes_idle_connection(self):
+        pool = HTTPConnectionPool()
+        self.assertEqual(pool.post_json(self.url, {'n': 1}), 204)
+        time.sleep(0.5)
+        self.assertEqual(pool.post_json(self.url, {'n': 2}), 204)
+        self.assertEqual(self.server.received, [{'n': 1}, {'n': 2}])
+        pool.close()
+
+    def test_stale_connection_is_not_a_failed_attempt(self):
+        dispatcher = ActionDispatcher([Destination('webhook', 'webhook', self.url, rate=0)],
+                                      flush_interval=0.05, backoff_seconds=5)
+        with self.assertNoLogs('dispatcher', level='WARNING'):
+            dispatcher.submit("192.0.2.7", "brute_force", ["alert"], 0.5)
+            time.sleep(0.5)
+            dispatcher.submit("192.0.2.8", "brute_force", ["alert"], 0.5)
+            dispatcher.close()
+        self.assertEqual(dispatcher.stats()['destinations']['webhook']['sent'], 2)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_zero_rate_is_unlimited(self):
+        bucket = TokenBucket(0)
+        start = time.monotonic()
+        for _ in range(100):
+            bucket.acquire()
+        self.assertLess(time.monotonic() - start, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import logging
+import os
+import queue
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from logging_setup import PER_EVENT, BoundedQueueHandler, EventSamplingFilter, SummarizingQueueListener
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class _Unformattable:
+    def __str__(self):
+        raise AssertionError("filtered record was formatted")
+
+
+def _record(msg, args=(), level=logging.INFO, per_event=True):
+    return logging.makeLogRecord({'name': 'test', 'levelno': level, 'levelname': logging.getLevelName(level),
+                                  'msg': msg, 'args': args, **(PER_EVENT if per_event else {})})
+
+
+class TestEventSamplingFilter(unittest.TestCase):
+    def test_decision_covers_whole_event(self):
+        sampler = EventSamplingFilter(sample_rate=0.5)
+        for _ in range(50):
+            keep = sampler.begin_event()
+            decisions = {sampler.filter(_record("step %s", (i,))) for i in range(6)}
+            self.assertEqual(decisions, {keep})
+
+    def test_warnings_and_plain_records_always_pass(self):
+        sampler = EventSamplingFilter(sample_rate=0.0)
+        sampler.begin_event()
+        self.assertFalse(sampler.filter(_record("Response logged: %s", (_Unformattable(),))))
+        self.assertTrue(sampler.filter(_record("Delivery failed", level=logging.WARNING)))
+        self.assertTrue(sampler.filter(_record("Model saved", per_event=False)))
+
+    def test_summary_counts_events_and_templates(self):
+        sampler = EventSamplingFilter(sample_rate=1.0)
+        for _ in range(3):
+            sampler.begin_event()
+            sampler.filter(_record("Ensemble anomaly score: %.2f", (0.5,)))
+        summary = sampler.take_summary()
+        self.assertIn("3 events, 3 sampled", summary.getMessage())
+        self.assertIn("('Ensemble anomaly score: %.2f', 3)", summary.getMessage())
+        self.assertIsNone(sampler.take_summary())
+
+
+class TestSummarizingQueueListener(unittest.TestCase):
+    def test_summary_is_emitted_while_idle(self):
+        log_queue = queue.Queue()
+        sampler = EventSamplingFilter(sample_rate=0.0, aggregate_seconds=0.1)
+        queue_handler = BoundedQueueHandler(log_queue)
+        queue_handler.addFilter(sampler)
+        target = _ListHandler()
+        listener = SummarizingQueueListener(log_queue, target, sampler=sampler)
+        listener.start()
+        try:
+            sampler.begin_event()
+            queue_handler.handle(_record("Detected attack from %s", ("192.0.2.1",)))
+            queue_handler.handle(_record("Delivery failed", level=logging.ERROR))
+            deadline = time.monotonic() + 5
+            while len(target.records) < 2 and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            listener.stop()
+        messages = [r.getMessage() for r in target.records]
+        self.assertEqual(messages[0], "Delivery failed")
+        self.assertIn("1 events, 0 sampled", messages[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
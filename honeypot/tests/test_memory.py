@@ -0,0 +1,137 @@
+import os
+import sys
+import unittest
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from memory import MemoryBudget, deep_sizeof
+from response import ResponseEngine
+
+MIB = 2 ** 20
+
+try:
+    from model import AdaptiveAttackDetector
+    AdaptiveAttackDetector()
+    DETECTOR_AVAILABLE = True
+except Exception:
+    DETECTOR_AVAILABLE = False
+
+
+class _Detector:
+    """
+    Stands in for AdaptiveAttackDetector with fixed component sizes.
+    """
+    def __init__(self, fixed_bytes, classifier_bytes, features=80, tree_bytes=4 * MIB):
+        self.fixed_bytes = fixed_bytes
+        self.classifier_bytes = classifier_bytes
+        self.feature_importance = {f"f{i}": float(i) for i in range(features)}
+        self.tree_bytes = tree_bytes
+        self.max_size = 100.0
+        self.calls = []
+
+    def memory_usage(self):
+        return {'anomaly_detector_0': self.fixed_bytes, 'classifier': self.classifier_bytes,
+                'feature_importance': deep_sizeof(self.feature_importance)}
+
+    def prune_feature_importance(self, max_features):
+        self.calls.append('prune')
+        excess = max(0, len(self.feature_importance) - max_features)
+        self.feature_importance = dict(list(self.feature_importance.items())[:max_features])
+        return excess
+
+    def tree_size_bytes(self):
+        return self.tree_bytes
+
+    def limit_tree_size(self, max_size_mib):
+        self.calls.append('limit')
+        if max_size_mib >= self.max_size:
+            return False
+        self.max_size = max_size_mib
+        return True
+
+
+def _responder_with_history(entries):
+    responder = ResponseEngine()
+    for _ in range(entries):
+        responder.strategies['brute_force']['success_history'].append(0.75)
+    return responder
+
+
+class TestMemoryBudget(unittest.TestCase):
+    def test_nothing_applied_below_soft_limit(self):
+        detector = _Detector(fixed_bytes=MIB, classifier_bytes=MIB)
+        report = MemoryBudget(100 * MIB).enforce(detector, _responder_with_history(20))
+        self.assertEqual(report['applied'], [])
+        self.assertEqual(detector.calls, [])
+
+    def test_unreachable_budget_warns_once(self):
+        budget = MemoryBudget(10 * MIB)
+        detector = _Detector(fixed_bytes=20 * MIB, classifier_bytes=MIB)
+        with self.assertLogs('memory', level='WARNING') as logs:
+            budget.enforce(detector)
+            budget.enforce(detector)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("cannot be met", logs.records[0].getMessage())
+        self.assertEqual(detector.calls, [])
+
+    def test_policies_applied_over_soft_limit(self):
+        budget = MemoryBudget(10 * MIB, max_features=50, history_limit=10, min_tree_mib=1.0, tree_shrink=0.75)
+        detector = _Detector(fixed_bytes=MIB, classifier_bytes=9 * MIB)
+        responder = _responder_with_history(20)
+        report = budget.enforce(detector, responder)
+        self.assertEqual(report['applied'], ["pruned 30 feature importances", "trimmed 10 history entries",
+                                             "capped classifier tree at 3.0 MiB"])
+        self.assertEqual(len(detector.feature_importance), 50)
+        self.assertEqual(detector.max_size, 3.0)
+        self.assertEqual(len(responder.strategies['brute_force']['success_history']), 10)
+        self.assertFalse(budget.due())
+
+    def test_tree_not_capped_below_minimum(self):
+        budget = MemoryBudget(10 * MIB, min_tree_mib=1.0)
+        detector = _Detector(fixed_bytes=MIB, classifier_bytes=9 * MIB, features=0, tree_bytes=MIB)
+        self.assertEqual(budget.enforce(detector)['applied'], [])
+        self.assertNotIn('limit', detector.calls)
+
+
+class TestTrimHistory(unittest.TestCase):
+    def test_keeps_at_least_five_entries(self):
+        responder = _responder_with_history(20)
+        for outcome in range(20):
+            responder.feedback_memory['suspicious'].append(outcome)
+        # 15 success entries, and 5 of the 10 the feedback ring buffer held
+        self.assertEqual(responder.trim_history(2), 20)
+        self.assertEqual(responder.history_limit, 5)
+        self.assertEqual(len(responder.strategies['brute_force']['success_history']), 5)
+        self.assertEqual(list(responder.feedback_memory['suspicious']), [15, 16, 17, 18, 19])
+        self.assertEqual(responder.feedback_memory['command_injection'].maxlen, 5)
+
+    def test_constructor_clamps_history_limit(self):
+        self.assertEqual(ResponseEngine(history_limit=1).history_limit, 5)
+
+
+class TestDeepSizeof(unittest.TestCase):
+    def test_counts_deque_contents(self):
+        items = [f"entry-{i}" * 10 for i in range(10)]
+        self.assertGreater(deep_sizeof(deque(items)), sum(sys.getsizeof(i) for i in items))
+
+
+@unittest.skipUnless(DETECTOR_AVAILABLE, "installed river lacks the detector's models")
+class TestDetectorPolicies(unittest.TestCase):
+    def setUp(self):
+        self.detector = AdaptiveAttackDetector()
+
+    def test_prune_keeps_most_important(self):
+        self.detector.feature_importance = {f"f{i}": float(i) for i in range(10)}
+        self.assertEqual(self.detector.prune_feature_importance(3), 7)
+        self.assertEqual(set(self.detector.feature_importance), {"f7", "f8", "f9"})
+        self.assertEqual(self.detector.prune_feature_importance(3), 0)
+
+    def test_limit_tree_size_only_lowers(self):
+        self.assertGreater(self.detector.tree_size_bytes(), 0)
+        self.assertTrue(self.detector.limit_tree_size(5.0))
+        self.assertFalse(self.detector.limit_tree_size(10.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
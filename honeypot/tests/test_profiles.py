@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from profiles import ThreatProfileStore
+
+
+class TestThreatProfileStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'profiles.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_update_and_evict(self):
+        store = ThreatProfileStore(max_profiles=2, snapshot_path=None)
+        now = datetime(2024, 1, 1, 12, 0)
+        store.update("192.0.2.1", now, score=0.4, attack_type="brute_force", actions=["alert"])
+        store.update("192.0.2.1", now, score=0.9, attack_type="brute_force", actions=["alert", "temp_block"])
+        profile = store.get("192.0.2.1")
+        self.assertEqual(profile['attempts'], 2)
+        self.assertEqual(profile['max_score'], 0.9)
+        self.assertEqual(profile['actions'], {"alert": 2, "temp_block": 1})
+        store.update("192.0.2.2", now)
+        store.update("192.0.2.3", now)
+        self.assertIsNone(store.get("192.0.2.1"))
+        self.assertEqual(store.evictions, 1)
+
+    def test_expired_block_is_not_reported(self):
+        store = ThreatProfileStore(snapshot_path=None)
+        now = datetime(2024, 1, 1, 12, 0)
+        store.update("192.0.2.1", now, block={'target': "192.0.2.1", 'expires': time.time() + 3600})
+        store.update("192.0.2.2", now, block={'target': "192.0.2.2", 'expires': time.time() - 1})
+        store.update("192.0.2.3", now, block={'target': "192.0.2.0/24", 'expires': None})
+        self.assertTrue(store.get("192.0.2.1")['blocked'])
+        self.assertIsNotNone(store.get("192.0.2.1")['blocked_until'])
+        self.assertFalse(store.get("192.0.2.2")['blocked'])
+        self.assertTrue(store.get("192.0.2.3")['blocked'])
+        self.assertIsNone(store.get("192.0.2.3")['blocked_until'])
+
+    def test_background_snapshot_and_reload(self):
+        store = ThreatProfileStore(snapshot_path=self.path, snapshot_seconds=0.05)
+        store.update("192.0.2.1", datetime(2024, 1, 1, 12, 0), score=0.5, attack_type="suspicious")
+        deadline = time.monotonic() + 5
+        while not os.path.exists(self.path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        store.close()
+        reloaded = ThreatProfileStore(snapshot_path=self.path)
+        self.assertEqual(reloaded.get("192.0.2.1")['attack_types'], {"suspicious": 1})
+
+    def test_routes(self):
+        store = ThreatProfileStore(snapshot_path=None)
+        store.update("192.0.2.1", datetime(2024, 1, 1, 12, 0))
+        self.assertEqual(store._route_ip("/ip/192.0.2.1", {}, None)[0], 200)
+        self.assertEqual(store._route_ip("/ip/192.0.2.9", {}, None)[0], 404)
+        status, body = store._route_bulk("/ips", {'ip': ["192.0.2.1"]}, {"ips": ["192.0.2.9"]})
+        self.assertEqual(status, 200)
+        self.assertIsNone(body["192.0.2.9"])
+
+
+if __name__ == "__main__":
+    unittest.main()
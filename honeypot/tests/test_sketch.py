@@ -0,0 +1,70 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core_ml'))
+
+from sketch import CountMinSketch, HyperLogLog, SpaceSaving, StreamAggregator
+
+
+class TestSketches(unittest.TestCase):
+    def test_count_min_never_undercounts(self):
+        cms = CountMinSketch(width=64, depth=4)
+        for i in range(500):
+            cms.add(f"10.0.0.{i % 50}")
+        cms.add("10.0.0.1", 5)
+        self.assertGreaterEqual(cms.estimate("10.0.0.1"), 15)
+        self.assertEqual(cms.total, 505)
+
+    def test_hyperloglog_estimate(self):
+        hll = HyperLogLog(10)
+        for i in range(1000):
+            hll.add(f"user{i}")
+        self.assertAlmostEqual(hll.count(), 1000, delta=100)
+
+    def test_space_saving_guaranteed_count(self):
+        ss = SpaceSaving(k=2)
+        ss.add("a", 10)
+        ss.add("b", 1)
+        ss.add("c", 1)
+        self.assertEqual(ss.guaranteed("a"), 10)
+        self.assertEqual(ss.guaranteed("c"), 1)
+        self.assertEqual(ss.guaranteed("b"), 0)
+
+
+class TestStreamAggregator(unittest.TestCase):
+    def test_window_attempts(self):
+        agg = StreamAggregator(window_seconds=60, buckets=6)
+        for t in range(0, 30):
+            agg.observe("198.51.100.7", t)
+        self.assertEqual(agg.features("198.51.100.7")['ip_window_attempts'], 30)
+        agg.observe("198.51.100.8", 200)
+        self.assertEqual(agg.features("198.51.100.7")['ip_window_attempts'], 0)
+
+    def test_distinct_counts_expire_after_gap(self):
+        agg = StreamAggregator(window_seconds=60, buckets=6)
+        for i in range(50):
+            agg.observe(f"192.0.2.{i}", 0, username=f"user{i}")
+        self.assertAlmostEqual(agg.distinct_ips(), 50, delta=5)
+        # The new event lands in a slot that was never used
+        agg.observe("203.0.113.1", 1010, username="root")
+        self.assertAlmostEqual(agg.distinct_ips(), 1, delta=0.5)
+        self.assertAlmostEqual(agg.distinct_usernames(), 1, delta=0.5)
+
+    def test_late_event_outside_window_is_ignored(self):
+        agg = StreamAggregator(window_seconds=60, buckets=6)
+        agg.observe("192.0.2.1", 1000)
+        agg.observe("192.0.2.2", 10)
+        self.assertEqual(agg.attempts("192.0.2.2"), 0)
+
+    def test_heavy_hitter_threshold(self):
+        agg = StreamAggregator(window_seconds=60, buckets=6, top_k=20, heavy_hitter_fraction=0.2)
+        for i in range(10):
+            agg.observe(f"192.0.2.{i}", 1)
+        agg.observe("203.0.113.9", 1, attempts=50)
+        self.assertEqual(agg.features("203.0.113.9")['ip_heavy_hitter'], 1)
+        self.assertEqual(agg.features("192.0.2.3")['ip_heavy_hitter'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()